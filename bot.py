@@ -2,9 +2,12 @@ import logging
 import sys
 import os
 from telegram import Update
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, CallbackQueryHandler, ConversationHandler
+from telegram.ext import Application, CommandHandler, MessageHandler, filters, CallbackQueryHandler, TypeHandler
 from telegram.ext import ContextTypes
 from config import config
+from rate_limiter import rate_limiter
+import callbacks
+from callbacks import callback_router
 
 # Добавьте путь к проекту
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -19,7 +22,7 @@ print("🔧 ЗАПУСК ПРОСТОГО РАБОЧЕГО БОТА")
 print("=" * 60)
 
 try:
-    from handlers.common_handlers import start, help_command, handle_unknown_command
+    from handlers.common_handlers import start, help_command, handle_unknown_command, identify_user
     print("✅ common_handlers загружен")
 except ImportError as e:
     print(f"❌ Ошибка common_handlers: {e}")
@@ -27,10 +30,11 @@ except ImportError as e:
 
 try:
     from handlers.admin_handlers import (
-        admin_dashboard, show_all_members, view_tasks_status,
+        admin_dashboard, show_all_members, view_tasks_status, view_tasks_status_callback, notify_settings,
         handle_member_info_callback, 
         assign_task_multi_conversation,
-        add_member_conversation
+        add_member_conversation,
+        broadcast_conversation
     )
     print("✅ admin_handlers загружен")
 except ImportError as e:
@@ -41,7 +45,7 @@ try:
     from handlers.member_handlers import (
         show_my_tasks, show_my_info,
         handle_task_view, handle_task_status_change,
-        handle_refresh_tasks, handle_back_to_list
+        handle_refresh_tasks, handle_back_to_list, handle_tasks_page
     )
     print("✅ member_handlers загружен")
 except ImportError as e:
@@ -57,21 +61,66 @@ async def test_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     print("🎯 TEST COMMAND ВЫЗВАНА!")
     await update.message.reply_text("✅ Тестовая команда работает!")
 
+async def post_init(application: Application):
+    """Запуск фоновых задач внутри цикла событий бота"""
+    from notifications import notification_service
+    from jobs import job_runtime
+    from firebase_service import async_firebase_service
+    job_runtime.start()
+    notification_service.start_worker()
+    
+    # Индексы user_tasks/deadline_key для заданий, созданных до их появления (один раз)
+    await async_firebase_service.ensure_task_indexes()
+    
+    if config.REMINDERS_ENABLED:
+        if application.job_queue is None:
+            print("⚠️  JobQueue недоступен (нужен python-telegram-bot[job-queue]) - напоминания отключены")
+        else:
+            from reminders import reminder_scheduler
+            reminder_scheduler.start(application.job_queue)
+            # Загружаем задания - планировщик пересоберется по снимку
+            await async_firebase_service.get_all_tasks()
+
+async def post_stop(application: Application):
+    """Дождаться фоновых задач, пока application.bot еще открыт (рассылки пишут через него)"""
+    from reminders import reminder_scheduler
+    from jobs import job_runtime
+    reminder_scheduler.stop()
+    # Фоновые задачи к тому же ставят сообщения в очередь уведомлений - воркер ее еще отправит
+    await job_runtime.shutdown(timeout=config.JOB_SHUTDOWN_TIMEOUT)
+
+async def post_shutdown(application: Application):
+    from notifications import notification_service
+    await notification_service.stop_worker()
+
 def main():
     """Запуск простого рабочего бота"""
     print(f"🤖 Бот запускается...")
     
-    application = Application.builder().token(config.BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(config.BOT_TOKEN)
+        .rate_limiter(rate_limiter)
+        .post_init(post_init)
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
+    
+    # 0. Определение участника по user id до всех остальных обработчиков
+    application.add_handler(TypeHandler(Update, identify_user), group=-1)
     
     # 1. Обработчики команд
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("test", test_command))  # ← ДОБАВЬ ЭТУ СТРОКУ
+    application.add_handler(CommandHandler("notify", notify_settings))
     
     # 2. Conversation handlers для админов
     try:
         application.add_handler(assign_task_multi_conversation)
         application.add_handler(add_member_conversation)
+        application.add_handler(broadcast_conversation)
         print("✅ Conversation handlers добавлены")
     except:
         print("⚠️  Conversation handlers пропущены")
@@ -79,20 +128,20 @@ def main():
     # 3. Callback handlers для заданий
     print("\n📌 Регистрация callback обработчиков:")
     
-    application.add_handler(CallbackQueryHandler(handle_task_view, pattern="^view_task_"))
-    print("✅ handle_task_view (view_task_)")
-    
-    application.add_handler(CallbackQueryHandler(handle_task_status_change, pattern="^set_status"))
-    print("✅ handle_task_status_change (set_status)")
-    
-    application.add_handler(CallbackQueryHandler(handle_refresh_tasks, pattern="^refresh_tasks$"))
-    print("✅ handle_refresh_tasks (refresh_tasks)")
-    
-    application.add_handler(CallbackQueryHandler(handle_back_to_list, pattern="^back_to_tasks$"))
-    print("✅ handle_back_to_list (back_to_tasks)")
-    
-    application.add_handler(CallbackQueryHandler(handle_member_info_callback, pattern="^member_info_"))
-    print("✅ handle_member_info_callback (member_info_)")
+    # Один обработчик на все кнопки: функция выбирается по коду операции из callback_data
+    routes = {
+        callbacks.VIEW_TASK: handle_task_view,
+        callbacks.SET_STATUS: handle_task_status_change,
+        callbacks.REFRESH_TASKS: handle_refresh_tasks,
+        callbacks.BACK_TO_TASKS: handle_back_to_list,
+        callbacks.TASKS_PAGE: handle_tasks_page,
+        callbacks.MEMBER_INFO: handle_member_info_callback,
+        callbacks.STATUS_REPORT: view_tasks_status_callback,
+    }
+    for op, handler in routes.items():
+        callback_router.route(op, handler)
+        print(f"✅ {handler.__name__} ({op})")
+    application.add_handler(CallbackQueryHandler(callback_router.dispatch, pattern=callback_router.handles))
     
     # 4. Обработчики сообщений для администраторов
     admin_patterns = [
@@ -115,13 +164,32 @@ def main():
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_unknown_command))
     print("✅ Обработчик неизвестных команд")
     
+    # 7. Realtime-синхронизация кэшей (опционально)
+    realtime_sync = None
+    if config.FIREBASE_REALTIME_SYNC:
+        from firebase_service import firebase_service
+        from realtime_sync import RealtimeSync
+        realtime_sync = RealtimeSync(firebase_service.firebase, check_interval=config.REALTIME_CHECK_INTERVAL)
+        realtime_sync.start()
+    
     print("\n" + "=" * 60)
     print("✅ БОТ ЗАПУЩЕН!")
     print("=" * 60)
     print("🎯 Теперь кнопки заданий должны работать")
     print("=" * 60)
     
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    try:
+        application.run_polling(allowed_updates=Update.ALL_TYPES)
+    finally:
+        if realtime_sync:
+            realtime_sync.stop()
+        from firebase_service import async_firebase_service
+        async_firebase_service.shutdown()
+        print(f"📊 Telegram: {rate_limiter.stats['requests']} запросов, "
+              f"{rate_limiter.stats['throttled']} придержано, {rate_limiter.stats['retry_after']} RetryAfter")
+        for pool in async_firebase_service.get_http_stats():
+            print(f"📊 {pool['host']}: {pool['requests']} запросов, "
+                  f"{pool['connections_opened']} соединений, {pool['reused']} переиспользовано")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,498 @@
+# cache.py
+import threading
+import time
+from itertools import islice
+from typing import Optional, List, Dict, Any, Set, Callable, Tuple
+from config import config
+from models import Member, Task, member_from_data, normalize_task_data, task_from_data
+
+
+def _set_path(data: Optional[Dict[str, Any]], segments: List[str], value: Any) -> Optional[Dict[str, Any]]:
+    """Записать значение по вложенному пути (как PUT в Firebase), None - удаление"""
+    if not segments:
+        return value
+    data = dict(data or {})
+    key, rest = segments[0], segments[1:]
+    child = data.get(key)
+    was_list = isinstance(child, list)
+    if was_list:
+        # Firebase отдает массивы списками, а адресует их индексами-ключами
+        child = {str(i): v for i, v in enumerate(child) if v is not None}
+    child = _set_path(child if isinstance(child, dict) else None, rest, value)
+    if child is None or child == {}:
+        data.pop(key, None)
+    elif was_list and isinstance(child, dict) and all(k.isdigit() for k in child):
+        data[key] = [child[k] for k in sorted(child, key=int)]
+    else:
+        data[key] = child
+    return data
+
+
+def username_key(telegram_username: str) -> str:
+    """Ключ username для поиска: без @ и пробелов, без учета регистра"""
+    return (telegram_username or "").strip().lstrip('@').lower()
+
+
+class MemberDirectory:
+    """Справочник участников в памяти процесса с индексами для O(1) поиска"""
+
+    def __init__(self, ttl: float = 0):
+        # ttl в секундах; 0 - справочник не устаревает
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._members: Dict[str, Member] = {}
+        self._by_username: Dict[str, str] = {}  # username_key(telegram) -> member_id
+        self._by_chat_id: Dict[int, str] = {}   # chat_id -> member_id
+        self._admins: Optional[List[tuple]] = None  # (username, chat_id, notify_mode), считается по требованию
+        self._versions: Dict[str, int] = {}     # member_id -> номер последнего изменения
+        self._generation = 0
+        self._loaded_at: Optional[float] = None
+
+    @property
+    def is_fresh(self) -> bool:
+        """Загружен ли справочник и не истек ли TTL"""
+        with self._lock:
+            if self._loaded_at is None:
+                return False
+            if not self.ttl:
+                return True
+            return time.monotonic() - self._loaded_at < self.ttl
+
+    def load(self, members_data: Optional[Dict[str, Any]]):
+        """Полностью перестроить справочник из снимка /members"""
+        with self._lock:
+            self._members.clear()
+            self._by_username.clear()
+            self._by_chat_id.clear()
+            self._admins = None
+            self._versions.clear()
+
+            for member_id, member_data in (members_data or {}).items():
+                member = member_from_data(member_id, member_data)
+                if member:
+                    self._index(member)
+
+            self._loaded_at = time.monotonic()
+            print(f"✅ Справочник участников загружен: {len(self._members)}")
+
+    def invalidate(self):
+        """Пометить справочник как устаревший (перезагрузится при следующем чтении)"""
+        with self._lock:
+            self._loaded_at = None
+
+    def get(self, member_id: str) -> Optional[Member]:
+        with self._lock:
+            return self._members.get(member_id)
+
+    def get_by_telegram(self, telegram_username: str) -> Optional[Member]:
+        with self._lock:
+            member_id = self._by_username.get(username_key(telegram_username))
+            return self._members.get(member_id) if member_id else None
+
+    def get_by_chat_id(self, chat_id: int) -> Optional[Member]:
+        with self._lock:
+            member_id = self._by_chat_id.get(chat_id)
+            return self._members.get(member_id) if member_id else None
+
+    def all(self) -> List[Member]:
+        with self._lock:
+            return list(self._members.values())
+
+    def chat_ids_for(self, usernames: List[str]) -> Dict[str, int]:
+        """chat_id для списка username'ов (только найденные и с установленным chat_id)"""
+        result = {}
+        with self._lock:
+            for username in usernames:
+                member_id = self._by_username.get(username_key(username))
+                member = self._members.get(member_id) if member_id else None
+                if member and member.chat_id > 0:
+                    result[username] = member.chat_id
+        return result
+
+    def admin_recipients(self) -> List[tuple]:
+        """Администраторы с chat_id: (username, chat_id, notify_mode). Пересчитывается только после изменений"""
+        with self._lock:
+            if self._admins is None:
+                self._admins = [
+                    (member.telegram, member.chat_id, member.notify_mode)
+                    for member in self._members.values()
+                    if member.is_admin and member.chat_id > 0
+                ]
+            return list(self._admins)
+
+    def upsert(self, member_id: str, member_data: Dict[str, Any]) -> Optional[Member]:
+        """Добавить или заменить участника"""
+        member = member_from_data(member_id, member_data)
+        with self._lock:
+            self._unindex(member_id)
+            if member:
+                self._index(member)
+        return member
+
+    def patch(self, member_id: str, changes: Dict[str, Any]) -> Optional[Member]:
+        """Обновить отдельные поля участника"""
+        with self._lock:
+            current = self._members.get(member_id)
+            if current is None:
+                # Участника нет в кэше - перечитаем при следующем обращении
+                self._loaded_at = None
+                return None
+            member_data = current.dict(exclude={"id"})
+            member_data.update(changes)
+            return self.upsert(member_id, member_data)
+
+    def remove(self, member_id: str):
+        with self._lock:
+            self._unindex(member_id)
+
+    def apply(self, segments: List[str], value: Any):
+        """Применить запись по пути относительно /members (событие realtime-потока)"""
+        if not segments:
+            self.load(value)
+            return
+        member_id, rest = segments[0], segments[1:]
+        with self._lock:
+            current = self._members.get(member_id)
+            current_data = current.dict(exclude={"id"}) if current else None
+            member_data = _set_path(current_data, rest, value)
+            if member_data is None:
+                self._unindex(member_id)
+            else:
+                self.upsert(member_id, member_data)
+
+    def version_of(self, member: Member) -> Optional[int]:
+        """Номер изменения участника, если это актуальный объект справочника (иначе None)"""
+        with self._lock:
+            if member.id is None or self._members.get(member.id) is not member:
+                return None
+            return self._versions.get(member.id)
+
+    def _index(self, member: Member):
+        self._members[member.id] = member
+        self._admins = None
+        self._generation += 1
+        self._versions[member.id] = self._generation
+        if member.telegram:
+            self._by_username[username_key(member.telegram)] = member.id
+        if member.chat_id and member.chat_id > 0:
+            self._by_chat_id[member.chat_id] = member.id
+
+    def _unindex(self, member_id: str):
+        member = self._members.pop(member_id, None)
+        self._versions.pop(member_id, None)
+        if member is None:
+            return
+        self._admins = None
+        key = username_key(member.telegram)
+        if self._by_username.get(key) == member_id:
+            del self._by_username[key]
+        if self._by_chat_id.get(member.chat_id) == member_id:
+            del self._by_chat_id[member.chat_id]
+
+
+class TaskStore:
+    """Хранилище заданий в памяти с индексом username -> множество ID заданий"""
+
+    def __init__(self, ttl: float = 0):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._data: Dict[str, Dict[str, Any]] = {}    # task_id -> нормализованные данные
+        self._parsed: Dict[str, Task] = {}            # task_id -> Task (разбирается лениво)
+        self._by_assignee: Dict[str, Set[str]] = {}   # username -> {task_id}
+        self._listeners: List[Callable[[Optional[str], Optional[Dict[str, Any]]], None]] = []
+        self._versions: Dict[str, int] = {}           # task_id -> номер последнего изменения
+        self.generation = 0                           # растет при любом изменении хранилища
+        self._loaded_at: Optional[float] = None
+
+    def add_listener(self, listener: Callable[[Optional[str], Optional[Dict[str, Any]]], None]):
+        """Подписаться на изменения: listener(task_id, данные или None при удалении).
+        После полной перезагрузки вызывается listener(None, None)."""
+        self._listeners.append(listener)
+
+    def _emit(self, task_id: Optional[str]):
+        """Оповестить подписчиков. Вызывается под блокировкой хранилища, иначе
+        конкурирующие изменения могут дойти до подписчиков в обратном порядке"""
+        if not self._listeners:
+            return
+        with self._lock:
+            task_data = self.get_data(task_id) if task_id is not None else None
+            for listener in self._listeners:
+                try:
+                    listener(task_id, task_data)
+                except Exception as e:
+                    print(f"❌ Ошибка подписчика хранилища заданий: {e}")
+
+    @property
+    def is_fresh(self) -> bool:
+        with self._lock:
+            if self._loaded_at is None:
+                return False
+            if not self.ttl:
+                return True
+            return time.monotonic() - self._loaded_at < self.ttl
+
+    def load(self, tasks_data: Optional[Dict[str, Any]]):
+        """Полностью перестроить хранилище из снимка /tasks"""
+        with self._lock:
+            self._data.clear()
+            self._parsed.clear()
+            self._by_assignee.clear()
+            self._versions.clear()
+
+            for task_id, task_data in (tasks_data or {}).items():
+                if isinstance(task_data, dict):
+                    self._index(task_id, normalize_task_data(task_data))
+
+            self._loaded_at = time.monotonic()
+            print(f"✅ Хранилище заданий загружено: {len(self._data)}")
+            self._emit(None)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def version_of(self, task: Task) -> Optional[int]:
+        """Номер изменения задания, если это актуальный объект хранилища (иначе None)"""
+        with self._lock:
+            if task.id is None or self._parsed.get(task.id) is not task:
+                return None
+            return self._versions.get(task.id)
+
+    def _bump(self, task_id: str):
+        self.generation += 1
+        self._versions[task_id] = self.generation
+
+    def __contains__(self, task_id: str) -> bool:
+        with self._lock:
+            return task_id in self._data
+
+    def get(self, task_id: str) -> Optional[Task]:
+        """Получить задание (Task создается один раз до следующего изменения)"""
+        with self._lock:
+            task = self._parsed.get(task_id)
+            if task is None and task_id in self._data:
+                task = task_from_data(task_id, self._data[task_id])
+                if task:
+                    self._parsed[task_id] = task
+            return task
+
+    def get_data(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            task_data = self._data.get(task_id)
+            return dict(task_data) if task_data is not None else None
+
+    def all(self) -> List[Task]:
+        with self._lock:
+            return [task for task in (self.get(task_id) for task_id in self._data) if task]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Копия сырых данных всех заданий"""
+        with self._lock:
+            return {task_id: dict(task_data) for task_id, task_data in self._data.items()}
+
+    def task_ids_for(self, username: str) -> List[str]:
+        """ID заданий пользователя в порядке создания (push ID монотонны)"""
+        with self._lock:
+            return sorted(self._by_assignee.get(username, ()))
+
+    def tasks_for(self, username: str) -> List[Task]:
+        with self._lock:
+            return [task for task in (self.get(task_id) for task_id in self.task_ids_for(username)) if task]
+
+    def page_for(self, username: str, page: int, page_size: int) -> Tuple[List[Task], int]:
+        """Страница заданий пользователя: незавершенные первыми, внутри - новые первыми.
+        Сортировка идет по сырым данным, Task создаются только для заданий страницы.
+        Возвращает (задания страницы, всего заданий)."""
+        with self._lock:
+            task_ids = sorted(self._by_assignee.get(username, ()), reverse=True)
+            task_ids.sort(key=lambda task_id: self._user_status(task_id, username) == "completed")
+            start = max(0, page) * page_size
+            tasks = [task for task in (self.get(task_id) for task_id in task_ids[start:start + page_size]) if task]
+            return tasks, len(task_ids)
+
+    def _user_status(self, task_id: str, username: str) -> str:
+        status = self._data[task_id].get("status")
+        return status.get(username, "not_started") if isinstance(status, dict) else (status or "not_started")
+
+    def upsert(self, task_id: str, task_data: Dict[str, Any]):
+        """Добавить или заменить задание"""
+        with self._lock:
+            self._unindex(task_id)
+            if isinstance(task_data, dict):
+                self._index(task_id, normalize_task_data(task_data))
+            self._emit(task_id)
+
+    def set_user_status(self, task_id: str, username: str, status: str, updated_at: str):
+        with self._lock:
+            task_data = self._data.get(task_id)
+            if task_data is None:
+                return
+            task_data.setdefault("status", {})[username] = status
+            task_data["updated_at"] = updated_at
+            self._parsed.pop(task_id, None)
+            self._bump(task_id)
+            self._emit(task_id)
+
+    def touch(self, task_id: str, updated_at: str):
+        with self._lock:
+            task_data = self._data.get(task_id)
+            if task_data is None:
+                return
+            task_data["updated_at"] = updated_at
+            self._parsed.pop(task_id, None)
+            self._bump(task_id)
+
+    def remove(self, task_id: str):
+        with self._lock:
+            self._unindex(task_id)
+            self._emit(task_id)
+
+    def apply(self, segments: List[str], value: Any):
+        """Применить запись по пути относительно /tasks (событие realtime-потока)"""
+        if not segments:
+            self.load(value)
+            return
+        task_id, rest = segments[0], segments[1:]
+        with self._lock:
+            task_data = _set_path(self._data.get(task_id), rest, value)
+            if task_data is None:
+                self._unindex(task_id)
+                self._emit(task_id)
+            else:
+                self.upsert(task_id, task_data)
+
+    def _index(self, task_id: str, task_data: Dict[str, Any]):
+        self._data[task_id] = task_data
+        self._bump(task_id)
+        for username in task_data.get("assigned_to") or []:
+            self._by_assignee.setdefault(username, set()).add(task_id)
+
+    def _unindex(self, task_id: str):
+        task_data = self._data.pop(task_id, None)
+        self._parsed.pop(task_id, None)
+        if task_data is None:
+            return
+        self.generation += 1
+        self._versions.pop(task_id, None)
+        for username in task_data.get("assigned_to") or []:
+            task_ids = self._by_assignee.get(username)
+            if task_ids is not None:
+                task_ids.discard(task_id)
+                if not task_ids:
+                    del self._by_assignee[username]
+
+
+class TaskStatusStats:
+    """Материализованная сводка статусов: итоги по статусам, исполнителям и заданиям.
+
+    Подписана на TaskStore и при изменении задания пересчитывает только его вклад,
+    поэтому отчет читает готовые счетчики, а не перебирает все задания.
+    """
+
+    STATUSES = ("not_started", "in_progress", "completed")
+
+    def __init__(self, task_store: TaskStore):
+        self.task_store = task_store
+        self._lock = threading.Lock()
+        self._by_task: Dict[str, Dict[str, str]] = {}   # task_id -> {username: статус}
+        self._titles: Dict[str, str] = {}                # task_id -> название
+        self._by_user: Dict[str, Dict[str, int]] = {}   # username -> {статус: число, "total": число}
+        # статус -> {(task_id, username): None}; порядок вставки = порядок последних изменений
+        self._items: Dict[str, Dict[Tuple[str, str], None]] = {status: {} for status in self.STATUSES}
+        task_store.add_listener(self._on_task_change)
+        self.rebuild()
+
+    def rebuild(self):
+        """Пересчитать сводку по снимку хранилища (после полной загрузки)"""
+        snapshot = self.task_store.snapshot()
+        with self._lock:
+            self._by_task.clear()
+            self._titles.clear()
+            self._by_user.clear()
+            for items in self._items.values():
+                items.clear()
+            for task_id, task_data in snapshot.items():
+                self._add(task_id, task_data)
+
+    def _on_task_change(self, task_id: Optional[str], task_data: Optional[Dict[str, Any]]):
+        """Подписчик TaskStore: перенести только назначения задания, статус которых изменился"""
+        if task_id is None:
+            self.rebuild()
+            return
+        with self._lock:
+            if task_data:
+                self._add(task_id, task_data)
+            else:
+                self._remove(task_id)
+
+    def _add(self, task_id: str, task_data: Dict[str, Any]):
+        statuses = task_data.get("status")
+        assignments = {}
+        for username in task_data.get("assigned_to") or []:
+            status = statuses.get(username, "not_started") if isinstance(statuses, dict) else (statuses or "not_started")
+            if status in self._items:
+                assignments[username] = status
+        self._update(task_id, assignments)
+        self._titles[task_id] = task_data.get("title") or ""
+
+    def _remove(self, task_id: str):
+        self._update(task_id, {})
+        self._titles.pop(task_id, None)
+
+    def _update(self, task_id: str, assignments: Dict[str, str]):
+        """Применить новые статусы исполнителей задания; неизменившиеся назначения остаются на месте"""
+        old = self._by_task.pop(task_id, {})
+        for username, status in old.items():
+            if assignments.get(username) == status:
+                continue
+            self._items[status].pop((task_id, username), None)
+            counts = self._by_user.get(username)
+            if counts is None:
+                continue
+            counts[status] -= 1
+            counts["total"] -= 1
+            if not counts["total"]:
+                del self._by_user[username]
+        for username, status in assignments.items():
+            if old.get(username) == status:
+                continue
+            self._items[status][(task_id, username)] = None
+            counts = self._by_user.setdefault(username, dict.fromkeys(self.STATUSES + ("total",), 0))
+            counts[status] += 1
+            counts["total"] += 1
+        if assignments:
+            self._by_task[task_id] = assignments
+
+    def summary(self) -> Dict[str, int]:
+        """Итоги: заданий, исполнителей и назначений в каждом статусе"""
+        with self._lock:
+            result = {status: len(items) for status, items in self._items.items()}
+            result["tasks"] = len(self._titles)
+            result["assignees"] = len(self._by_user)
+            return result
+
+    def by_user(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {username: dict(counts) for username, counts in self._by_user.items()}
+
+    def for_task(self, task_id: str) -> Dict[str, int]:
+        """Сколько исполнителей задания в каждом статусе"""
+        with self._lock:
+            result = dict.fromkeys(self.STATUSES, 0)
+            for status in self._by_task.get(task_id, {}).values():
+                result[status] += 1
+            return result
+
+    def page(self, status: str, page: int, page_size: int) -> Tuple[List[Tuple[str, str, str]], int]:
+        """Страница назначений в статусе (последние изменения первыми): ([(task_id, название, username)], всего)"""
+        with self._lock:
+            items = self._items.get(status, {})
+            start = max(0, page) * page_size
+            keys = list(islice(reversed(items.keys()), start, start + page_size))
+            return [(task_id, self._titles.get(task_id, ""), username) for task_id, username in keys], len(items)
+
+
+# Общие кэши для всех экземпляров FirebaseService
+member_directory = MemberDirectory(ttl=config.MEMBER_CACHE_TTL)
+task_store = TaskStore(ttl=config.TASK_CACHE_TTL)
+task_stats = TaskStatusStats(task_store)
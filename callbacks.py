@@ -0,0 +1,113 @@
+# callbacks.py
+from typing import Optional, List, Dict, Tuple, Callable, Awaitable
+from telegram import Update
+from telegram.ext import ContextTypes
+
+# Формат callback_data: <версия><код операции><аргументы через ":">, например "1v-NxY..." или "1s-NxY...:c".
+# Push ID Firebase и username Telegram уже состоят из URL-safe символов base64,
+# поэтому идут как есть; статусы и прочие перечисления - одним символом.
+VERSION = "1"
+SEPARATOR = ":"
+
+# Лимит Telegram на callback_data
+MAX_CALLBACK_BYTES = 64
+
+# Коды операций
+VIEW_TASK = "v"        # task_id
+SET_STATUS = "s"       # task_id, код статуса
+TASKS_PAGE = "p"       # страница
+REFRESH_TASKS = "r"
+BACK_TO_TASKS = "b"
+MEMBER_INFO = "m"      # username
+ASSIGN_TO = "a"        # username
+STATUS_REPORT = "t"    # [код статуса, страница]; без аргументов - сводка
+TOGGLE_USER = "u"      # username
+SELECT_PAGE = "g"      # страница
+
+STATUS_CODES = {"not_started": "n", "in_progress": "i", "completed": "c"}
+STATUSES_BY_CODE = {code: status for status, code in STATUS_CODES.items()}
+
+
+def encode(op: str, *args) -> str:
+    """Собрать callback_data; ValueError - если не укладывается в лимит Telegram"""
+    data = VERSION + op + SEPARATOR.join(str(arg) for arg in args)
+    if len(data.encode("utf-8")) > MAX_CALLBACK_BYTES:
+        raise ValueError(f"callback_data длиннее {MAX_CALLBACK_BYTES} байт: {data}")
+    return data
+
+
+# Кнопки старого формата остаются в уже отправленных сообщениях
+_LEGACY_STATUS_CODES = {"NOT": "n", "IN": "i", "COMPLETED": "c"}
+
+
+def _legacy_status_report(rest: str) -> Tuple[str, List[str]]:
+    if rest == "summary":
+        return STATUS_REPORT, []
+    status, _, page = rest.rpartition("_")
+    return STATUS_REPORT, [STATUS_CODES.get(status, status), page]
+
+
+def _legacy_set_status(rest: str) -> Tuple[str, List[str]]:
+    task_id, _, code = rest.partition("|")
+    return SET_STATUS, [task_id, _LEGACY_STATUS_CODES.get(code, code)]
+
+
+_LEGACY_PREFIXES: List[Tuple[str, Callable[[str], Tuple[str, List[str]]]]] = [
+    ("view_task_", lambda rest: (VIEW_TASK, [rest])),
+    ("set_status|", _legacy_set_status),
+    ("tasks_page_", lambda rest: (TASKS_PAGE, [rest])),
+    ("refresh_tasks", lambda rest: (REFRESH_TASKS, [])),
+    ("back_to_tasks", lambda rest: (BACK_TO_TASKS, [])),
+    ("member_info_", lambda rest: (MEMBER_INFO, [rest])),
+    ("assign_to_", lambda rest: (ASSIGN_TO, [rest])),
+    ("tstat_", _legacy_status_report),
+    ("toggle_user_", lambda rest: (TOGGLE_USER, [rest])),
+    ("select_page_", lambda rest: (SELECT_PAGE, [rest])),
+]
+
+
+def decode(data: Optional[str]) -> Optional[Tuple[str, List[str]]]:
+    """Разобрать callback_data в (код операции, аргументы); None - если формат неизвестен"""
+    if not data:
+        return None
+    if data[0] == VERSION and len(data) >= 2:
+        payload = data[2:]
+        return data[1], payload.split(SEPARATOR) if payload else []
+    for prefix, parse in _LEGACY_PREFIXES:
+        if data.startswith(prefix):
+            return parse(data[len(prefix):])
+    return None
+
+
+def matches(op: str) -> Callable[[str], bool]:
+    """Фильтр для CallbackQueryHandler(pattern=...) внутри ConversationHandler"""
+    def check(data: str) -> bool:
+        decoded = decode(data)
+        return decoded is not None and decoded[0] == op
+    return check
+
+
+class CallbackRouter:
+    """Единый обработчик callback-кнопок: выбор функции по коду операции из словаря.
+
+    Функция вызывается как handler(update, context, *аргументы).
+    """
+
+    def __init__(self):
+        self._routes: Dict[str, Callable[..., Awaitable]] = {}
+
+    def route(self, op: str, handler: Callable[..., Awaitable]):
+        self._routes[op] = handler
+
+    def handles(self, data: str) -> bool:
+        """Фильтр для CallbackQueryHandler: кнопки без маршрута достаются другим обработчикам"""
+        decoded = decode(data)
+        return decoded is not None and decoded[0] in self._routes
+
+    async def dispatch(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        op, args = decode(update.callback_query.data)
+        return await self._routes[op](update, context, *args)
+
+
+# Глобальный экземпляр (маршруты регистрируются в bot.py)
+callback_router = CallbackRouter()
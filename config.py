@@ -17,6 +17,31 @@ class Config:
     FIREBASE_MESSAGING_SENDER_ID = os.getenv('FIREBASE_MESSAGING_SENDER_ID')
     FIREBASE_APP_ID = os.getenv('FIREBASE_APP_ID')
     
+    # Кэш участников в памяти процесса (секунды, 0 - без истечения)
+    MEMBER_CACHE_TTL = float(os.getenv('MEMBER_CACHE_TTL', '300'))
+    # Кэш заданий в памяти процесса (секунды, 0 - без истечения)
+    TASK_CACHE_TTL = float(os.getenv('TASK_CACHE_TTL', '300'))
+    
+    # Заданий на одной странице списка «Мои задания»
+    TASKS_PAGE_SIZE = int(os.getenv('TASKS_PAGE_SIZE', '8'))
+    # Назначений на одной странице отчета «Статус заданий»
+    STATUS_PAGE_SIZE = int(os.getenv('STATUS_PAGE_SIZE', '20'))
+    # Участников на одной странице выбора исполнителей
+    SELECTION_PAGE_SIZE = int(os.getenv('SELECTION_PAGE_SIZE', '10'))
+    
+    # Размер пула потоков для запросов к Firebase из async-обработчиков
+    FIREBASE_MAX_WORKERS = int(os.getenv('FIREBASE_MAX_WORKERS', '8'))
+    
+    # HTTP-сессия для REST-запросов к Firebase
+    FIREBASE_POOL_SIZE = int(os.getenv('FIREBASE_POOL_SIZE', str(max(FIREBASE_MAX_WORKERS, 10))))
+    FIREBASE_CONNECT_TIMEOUT = float(os.getenv('FIREBASE_CONNECT_TIMEOUT', '5'))
+    FIREBASE_READ_TIMEOUT = float(os.getenv('FIREBASE_READ_TIMEOUT', '15'))
+    FIREBASE_MAX_RETRIES = int(os.getenv('FIREBASE_MAX_RETRIES', '3'))
+    
+    # Realtime-подписка на /members и /tasks для поддержания кэшей
+    FIREBASE_REALTIME_SYNC = os.getenv('FIREBASE_REALTIME_SYNC', 'false').lower() in ('1', 'true', 'yes')
+    REALTIME_CHECK_INTERVAL = float(os.getenv('REALTIME_CHECK_INTERVAL', '15'))
+    
     # 🔧 КРИТИЧЕСКОЕ ИЗМЕНЕНИЕ:
     # Только ВЕРХНЕЕ руководство считается администраторами
     ADMIN_ROLES = {
@@ -39,6 +64,50 @@ class Config:
     # Заместители и рядовые сотрудники - НЕ администраторы
     # "Зам ↑", "Deputy", "Event Managers", "Creative Students" и т.д. - обычные участники
     
+    # Сколько сообщений уведомлений отправляется одновременно
+    NOTIFY_MAX_CONCURRENCY = int(os.getenv('NOTIFY_MAX_CONCURRENCY', '10'))
+    
+    # Лимиты Telegram на отправку (сообщений в секунду)
+    TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', '30'))
+    TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', '1'))
+    TELEGRAM_GROUP_RATE = float(os.getenv('TELEGRAM_GROUP_RATE', str(20 / 60)))
+    TELEGRAM_CHAT_BURST = float(os.getenv('TELEGRAM_CHAT_BURST', '3'))
+    TELEGRAM_MAX_RETRIES = int(os.getenv('TELEGRAM_MAX_RETRIES', '3'))
+    
+    # Локальная SQLite-база бота (очередь уведомлений и т.п.), лежит в томе контейнера
+    LOCAL_DB_PATH = os.getenv('LOCAL_DB_PATH', 'data/bot.sqlite3')
+    
+    # Сколько секунд доверять сохраненному соответствию Telegram user id -> участник (0 - без истечения)
+    IDENTITY_TTL = float(os.getenv('IDENTITY_TTL', '21600'))
+    
+    # Постоянная очередь исходящих уведомлений
+    OUTBOX_ENABLED = os.getenv('OUTBOX_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '50'))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '8'))
+    OUTBOX_RETRY_BASE_DELAY = float(os.getenv('OUTBOX_RETRY_BASE_DELAY', '2'))
+    OUTBOX_RETRY_MAX_DELAY = float(os.getenv('OUTBOX_RETRY_MAX_DELAY', '600'))
+    # Сколько дней хранить недоставленные сообщения (для разбора ошибок)
+    OUTBOX_RETENTION_DAYS = float(os.getenv('OUTBOX_RETENTION_DAYS', '7'))
+    
+    # Сводки изменений статусов для администраторов
+    # Режим по умолчанию: instant / batched / daily (каждый админ может сменить через /notify)
+    ADMIN_NOTIFY_MODE = os.getenv('ADMIN_NOTIFY_MODE', 'batched')
+    DIGEST_WINDOW_SECONDS = float(os.getenv('DIGEST_WINDOW_SECONDS', '600'))
+    DIGEST_DAILY_HOUR = int(os.getenv('DIGEST_DAILY_HOUR', '21'))
+    
+    # Фоновые задачи обработчиков (уведомления и т.п.)
+    JOB_NOTIFY_WORKERS = int(os.getenv('JOB_NOTIFY_WORKERS', '4'))
+    JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', '500'))
+    JOB_SHUTDOWN_TIMEOUT = float(os.getenv('JOB_SHUTDOWN_TIMEOUT', '30'))
+    
+    # Рассылки /broadcast: сколько получателей обрабатывать за один шаг прогресса
+    BROADCAST_CHUNK_SIZE = int(os.getenv('BROADCAST_CHUNK_SIZE', '30'))
+    
+    # Напоминания о дедлайнах: за сколько дней и в котором часу (локальное время)
+    REMINDERS_ENABLED = os.getenv('REMINDERS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    REMINDER_DAYS_BEFORE = [int(days) for days in os.getenv('REMINDER_DAYS_BEFORE', '1,0').split(',') if days.strip()]
+    REMINDER_HOUR = int(os.getenv('REMINDER_HOUR', '10'))
+    
     # Task statuses
     TASK_STATUSES = {
         "not_started": "Не начато",
@@ -0,0 +1,97 @@
+# digest.py
+import threading
+import time
+from typing import Optional, List, Dict, Any, Tuple
+from storage import connect
+
+
+class DigestBuffer:
+    """Буфер изменений статусов для сводок администраторам (SQLite).
+
+    Повторные изменения одного задания одним участником схлопываются:
+    остается первый старый статус и последний новый. Сводка получателя
+    уходит, когда наступает самое раннее время отправки среди его записей.
+    """
+
+    def __init__(self, path: str = None):
+        self._lock = threading.Lock()
+        self.conn = connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS digest_items (
+                recipient TEXT NOT NULL,
+                chat_id INTEGER NOT NULL,
+                task_id TEXT NOT NULL,
+                task_title TEXT NOT NULL,
+                member TEXT NOT NULL,
+                old_status TEXT NOT NULL,
+                new_status TEXT NOT NULL,
+                flush_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (recipient, task_id, member)
+            );
+            CREATE INDEX IF NOT EXISTS digest_flush ON digest_items (flush_at);
+        """)
+
+    def add_many(self, recipients: List[Tuple[str, int, float]], task_id: str, task_title: str,
+                 member: str, old_status: str, new_status: str) -> int:
+        """Добавить изменение в сводки получателей: recipients - (username, chat_id, flush_at)"""
+        now = time.time()
+        rows = [
+            (recipient, chat_id, task_id, task_title, member, old_status, new_status, flush_at, now, now)
+            for recipient, chat_id, flush_at in recipients
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(
+                    "INSERT INTO digest_items (recipient, chat_id, task_id, task_title, member, old_status, "
+                    "new_status, flush_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (recipient, task_id, member) DO UPDATE SET "
+                    "chat_id = excluded.chat_id, task_title = excluded.task_title, "
+                    "new_status = excluded.new_status, updated_at = excluded.updated_at",
+                    rows
+                )
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+        return len(rows)
+
+    def due_recipients(self) -> List[str]:
+        """Получатели, чьи сводки пора отправлять"""
+        with self._lock:
+            cursor = self.conn.execute(
+                "SELECT recipient FROM digest_items GROUP BY recipient HAVING MIN(flush_at) <= ?",
+                (time.time(),)
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def take(self, recipient: str) -> List[Dict[str, Any]]:
+        """Забрать (и удалить) все накопленные записи получателя"""
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                cursor = self.conn.execute(
+                    "SELECT * FROM digest_items WHERE recipient = ? ORDER BY created_at",
+                    (recipient,)
+                )
+                items = [dict(row) for row in cursor.fetchall()]
+                self.conn.execute("DELETE FROM digest_items WHERE recipient = ?", (recipient,))
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return items
+
+    def next_flush_at(self) -> Optional[float]:
+        """Время ближайшей отправки сводки"""
+        with self._lock:
+            row = self.conn.execute("SELECT MIN(flush_at) FROM digest_items").fetchone()
+            return row[0] if row else None
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM digest_items").fetchone()[0]
@@ -1,11 +1,21 @@
 # firebase_service.py
 import pyrebase
-from typing import Optional, List, Dict, Any, Union
+import asyncio
+import json
+import re
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Union, Tuple
 from config import config
-from models import Member, Task, TaskStatus, UserRole, SingleUserTask
-import time
+from models import Member, Task, TaskStatus, TaskComment, UserRole, SingleUserTask, member_from_data, task_from_data, deadline_key
+from http_session import create_session, session_stats
+from cache import MemberDirectory, TaskStore, member_directory, task_store, task_stats, username_key
 from datetime import datetime
 
+# Версия индексов user_tasks/deadline_key: при увеличении миграция выполнится еще раз
+TASK_INDEXES_VERSION = 1
+
 # Глобальный экземпляр Firebase
 _firebase_instance = None
 _db_instance = None
@@ -28,6 +38,13 @@ def get_firebase():
         
         try:
             _firebase_instance = pyrebase.initialize_app(firebase_config)
+            # Общая keep-alive сессия для всех запросов к базе
+            _firebase_instance.requests = create_session(
+                pool_size=config.FIREBASE_POOL_SIZE,
+                connect_timeout=config.FIREBASE_CONNECT_TIMEOUT,
+                read_timeout=config.FIREBASE_READ_TIMEOUT,
+                max_retries=config.FIREBASE_MAX_RETRIES
+            )
             _db_instance = _firebase_instance.database()
             print("✅ Firebase успешно инициализирован")
         except Exception as e:
@@ -39,58 +56,55 @@ def get_firebase():
 
 class FirebaseService:
     def __init__(self):
-        self.firebase, self.db = get_firebase()
+        self.firebase, _ = get_firebase()
+        self._local = threading.local()
+        self.member_directory = member_directory
+        self.task_store = task_store
+    
+    @property
+    def db(self):
+        """Экземпляр Database для текущего потока (pyrebase хранит путь запроса внутри объекта)"""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self.firebase.database()
+            self._local.db = db
+        return db
+    
+    def get_http_stats(self) -> List[Dict[str, Any]]:
+        """Статистика переиспользования соединений с Firebase по хостам"""
+        return session_stats(self.firebase.requests)
+    
+    def multi_update(self, updates: Dict[str, Any]):
+        """Атомарно записать несколько путей одним PATCH в корень базы
+        (ключи - пути от корня, например "tasks/<id>/updated_at")"""
+        if updates:
+            self.db.update(updates)
     
     # ============== МЕТОДЫ ДЛЯ УЧАСТНИКОВ ==============
     
+    def _members(self) -> MemberDirectory:
+        """Справочник участников (загружается одним запросом при необходимости)"""
+        if not self.member_directory.is_fresh:
+            members = self.db.child("members").get().val()
+            self.member_directory.load(members)
+        return self.member_directory
+    
     def get_member_by_telegram(self, telegram_username: str) -> Optional[Member]:
         """Получить информацию о члене клуба по Telegram username"""
         try:
-            # Удаляем @ если есть
-            if telegram_username.startswith('@'):
-                telegram_username = telegram_username[1:]
-            
-            members = self.db.child("members").get().val()
-            if not members:
-                print("❌ В базе данных нет членов")
-                return None
-            
-            print(f"🔍 Поиск пользователя: {telegram_username}")
-            
-            for member_id, member_data in members.items():
-                member_telegram = member_data.get("telegram", "")
-                # Сравниваем без учета регистра
-                if member_telegram.lower() == telegram_username.lower():
-                    print(f"✅ Найден пользователь: {member_telegram}")
-                    
-                    # Нормализуем chat_id
-                    if "chat_id" in member_data:
-                        chat_id = member_data["chat_id"]
-                        # Конвертируем None/null в 0
-                        if chat_id is None or chat_id == "" or str(chat_id).lower() == "null":
-                            member_data["chat_id"] = 0
-                    else:
-                        member_data["chat_id"] = 0
-                    
-                    # Добавляем ID
-                    member_data_with_id = member_data.copy()
-                    member_data_with_id["id"] = member_id
-                    
-                    # Создаем объект Member
-                    try:
-                        member = Member(**member_data_with_id)
-                        return member
-                    except Exception as e:
-                        print(f"❌ Ошибка создания Member: {e}")
-                        print(f"📊 Данные: {member_data_with_id}")
-                        # Возвращаем упрощенную версию
-                        return Member(
-                            id=member_id,
-                            telegram=member_telegram,
-                            full_name_ru=member_data.get("full_name_ru", ""),
-                            role=member_data.get("role", "Member"),
-                            chat_id=member_data.get("chat_id", 0)
-                        )
+            telegram_username = username_key(telegram_username)
+            
+            if self.member_directory.is_fresh:
+                # Актуальный справочник - окончательный ответ, промах означает "не участник"
+                member = self.member_directory.get_by_telegram(telegram_username)
+            else:
+                # Справочник не загружен или устарел - сначала точечный запрос по индексу.
+                # Запрос чувствителен к регистру, поэтому при промахе решает справочник
+                member = self.query_member_by_telegram(telegram_username)
+                if member is None:
+                    member = self._members().get_by_telegram(telegram_username)
+            if member:
+                return member
             
             print(f"❌ Пользователь {telegram_username} не найден")
             return None
@@ -98,131 +112,126 @@ class FirebaseService:
             print(f"❌ Ошибка при поиске пользователя: {e}")
             return None
     
+    def get_member(self, member_id: str) -> Optional[Member]:
+        """Получить участника по ID"""
+        try:
+            return self._members().get(member_id)
+        except Exception as e:
+            print(f"❌ Ошибка при получении участника {member_id}: {e}")
+            return None
+    
+    def get_member_by_chat_id(self, chat_id: int) -> Optional[Member]:
+        """Получить участника по chat_id"""
+        try:
+            return self._members().get_by_chat_id(chat_id)
+        except Exception as e:
+            print(f"❌ Ошибка при поиске участника по chat_id {chat_id}: {e}")
+            return None
+    
     def get_all_members(self) -> List[Member]:
         """Получить всех членов клуба"""
         try:
-            members = self.db.child("members").get().val()
+            members = self._members().all()
             if not members:
                 print("⚠️  В базе данных нет членов")
-                return []
-            
-            result = []
-            errors = []
-            
-            for member_id, member_data in members.items():
-                try:
-                    # Добавляем ID
-                    member_data_with_id = member_data.copy()
-                    member_data_with_id["id"] = member_id
-                    
-                    # Создаем объект Member
-                    member = Member(**member_data_with_id)
-                    result.append(member)
-                    
-                except Exception as e:
-                    errors.append(f"Ошибка в member {member_id}: {e}")
-                    print(f"⚠️  Ошибка парсинга member {member_id}: {e}")
-                    print(f"📊 Проблемные данные: {member_data}")
-                    
-                    # Добавляем упрощенную версию
-                    try:
-                        simple_member = Member(
-                            id=member_id,
-                            telegram=member_data.get("telegram", ""),
-                            full_name_ru=member_data.get("full_name_ru", "Неизвестно"),
-                            role=member_data.get("role", "Member")
-                        )
-                        result.append(simple_member)
-                    except:
-                        pass
-            
-            if errors:
-                print(f"⚠️  Всего ошибок при загрузке: {len(errors)}")
-                for error in errors[:3]:  # Показываем первые 3 ошибки
-                    print(f"   - {error}")
-                if len(errors) > 3:
-                    print(f"   ... и еще {len(errors) - 3} ошибок")
-            
-            print(f"✅ Успешно загружено {len(result)} из {len(members)} членов клуба")
-            return result
-            
+            return members
         except Exception as e:
             print(f"❌ Критическая ошибка при получении всех членов: {e}")
             return []
     
-    def update_member_chat_id(self, member_id: str, chat_id: int) -> bool:
-        """Обновить chat_id участника"""
+    def allocate_member_id(self, max_attempts: int = 10) -> Optional[str]:
+        """Выдать следующий ID вида member_NNN.
+        
+        Счетчик counters/members увеличивается условной записью по ETag
+        (compare-and-set), поэтому одновременные администраторы не получат
+        один и тот же ID, а удаление участников не приводит к повторам.
+        Справочник участников не читается: только при первом запуске счетчик
+        засевается по ключам /members (shallow-запрос без данных участников).
+        """
+        base_url = config.FIREBASE_DATABASE_URL.rstrip('/')
+        url = f"{base_url}/counters/members.json"
+        session = self.firebase.requests
         try:
-            print(f"\n🔥 DEBUG update_member_chat_id:")
-            print(f"  member_id: {member_id}")
-            print(f"  chat_id для сохранения: {chat_id} (тип: {type(chat_id)})")
+            response = session.get(url, headers={"X-Firebase-ETag": "true"})
+            response.raise_for_status()
+            etag, current = response.headers.get("ETag"), response.json()
+            
+            for _ in range(max_attempts):
+                if current is None:
+                    # Счетчика еще нет - продолжаем нумерацию существующих участников
+                    keys = session.get(f"{base_url}/members.json", params={"shallow": "true"})
+                    keys.raise_for_status()
+                    numbers = [int(m.group(1)) for m in (re.fullmatch(r"member_(\d+)", key) for key in (keys.json() or {})) if m]
+                    current = max(numbers, default=0)
+                
+                next_number = int(current) + 1
+                
+                response = session.put(url, data=json.dumps(next_number), headers={"if-match": etag})
+                if response.status_code == 412:
+                    # Счетчик изменил кто-то другой - повторяем с актуальным значением
+                    etag, current = response.headers.get("ETag"), response.json()
+                    continue
+                response.raise_for_status()
+                
+                member_id = f"member_{next_number:03d}"
+                print(f"✅ Выделен ID участника: {member_id}")
+                return member_id
             
-            # Проверяем, что member_id существует
+            print(f"❌ Не удалось выделить ID участника за {max_attempts} попыток")
+            return None
+        except Exception as e:
+            print(f"❌ Ошибка выделения ID участника: {e}")
+            return None
+    
+    def save_member(self, member_id: str, member: Member) -> bool:
+        """Сохранить участника целиком"""
+        try:
+            member_data = member.dict(exclude={"id"})
+            self.db.child("members").child(member_id).set(member_data)
+            self.member_directory.upsert(member_id, member_data)
+            print(f"✅ Участник {member_id} сохранен")
+            return True
+        except Exception as e:
+            print(f"❌ Ошибка при сохранении участника {member_id}: {e}")
+            return False
+    
+    def update_member(self, member_id: str, fields: Dict[str, Any]) -> bool:
+        """Обновить отдельные поля участника"""
+        try:
+            self.db.child("members").child(member_id).update(fields)
+            self.member_directory.patch(member_id, fields)
+            return True
+        except Exception as e:
+            print(f"❌ Ошибка при обновлении участника {member_id}: {e}")
+            return False
+    
+    def update_member_chat_id(self, member_id: str, chat_id: int) -> bool:
+        """Обновить chat_id участника (без запросов, если он не изменился)"""
+        try:
             if not member_id:
-                print(f"  ❌ member_id пустой")
+                print("❌ member_id пустой")
                 return False
             
-            # Проверяем, что chat_id валидный
             if not chat_id or chat_id <= 0:
-                print(f"  ❌ Невалидный chat_id: {chat_id}")
+                print(f"❌ Невалидный chat_id: {chat_id}")
                 return False
             
-            # Получаем текущие данные для логирования
-            try:
-                current_data = self.db.child("members").child(member_id).get().val()
-                print(f"  📊 Текущие данные в Firebase: {current_data}")
-                
-                if current_data:
-                    current_chat_id = current_data.get("chat_id", 0)
-                    print(f"  📱 Текущий chat_id в Firebase: {current_chat_id}")
-                else:
-                    print(f"  ⚠️  Участник {member_id} не найден в Firebase")
-                    return False
-            except Exception as e:
-                print(f"  ❌ Ошибка получения текущих данных: {e}")
+            member = self._members().get(member_id)
+            if member is None:
+                print(f"⚠️  Участник {member_id} не найден")
                 return False
             
-            print(f"  🔄 Обновляю chat_id...")
+            if member.chat_id == chat_id:
+                # Повторный /start - в базе уже актуальное значение
+                return True
             
-            try:
-                # Обновляем в базе
-                self.db.child("members").child(member_id).update({"chat_id": chat_id})
-                print(f"  ✅ Запрос на обновление отправлен")
-            except Exception as e:
-                print(f"  ❌ Ошибка при отправке запроса: {e}")
-                return False
-            
-            # Небольшая задержка для обновления
-            import time
-            time.sleep(0.5)
-            
-            # Проверяем обновление
-            try:
-                updated_data = self.db.child("members").child(member_id).get().val()
-                print(f"  📊 Обновленные данные: {updated_data}")
-                
-                if updated_data:
-                    updated_chat_id = updated_data.get("chat_id")
-                    print(f"  📱 Обновленный chat_id в Firebase: {updated_chat_id}")
-                    
-                    if updated_chat_id == chat_id:
-                        print(f"  ✅ Chat_id успешно обновлен в Firebase!")
-                        return True
-                    else:
-                        print(f"  ❌ Ошибка: chat_id не совпадает. Ожидалось: {chat_id}, получено: {updated_chat_id}")
-                        return False
-                else:
-                    print(f"  ❌ Данные не найдены после обновления")
-                    return False
-                    
-            except Exception as e:
-                print(f"  ❌ Ошибка при проверке обновления: {e}")
-                return False
-                
+            # Запись идемпотентна: при гонке двух /start побеждает последний, что и нужно
+            self.multi_update({f"members/{member_id}/chat_id": chat_id})
+            self.member_directory.patch(member_id, {"chat_id": chat_id})
+            print(f"✅ Chat_id {member_id} обновлен: {member.chat_id} -> {chat_id}")
+            return True
         except Exception as e:
-            print(f"❌ Критическая ошибка в update_member_chat_id: {e}")
-            import traceback
-            traceback.print_exc()
+            print(f"❌ Ошибка в update_member_chat_id: {e}")
             return False
         
     def get_chat_id_by_username(self, telegram_username: str) -> Optional[int]:
@@ -258,18 +267,27 @@ class FirebaseService:
             traceback.print_exc()
             return None
     
+    def get_chat_ids(self, usernames: List[str]) -> Dict[str, int]:
+        """Получить chat_id сразу для многих username'ов (один снимок справочника)"""
+        try:
+            chat_ids = self._members().chat_ids_for(usernames)
+            missing = [username for username in usernames if username not in chat_ids]
+            if missing:
+                print(f"⚠️  Нет chat_id для: {', '.join('@' + username for username in missing)}")
+            return chat_ids
+        except Exception as e:
+            print(f"❌ Ошибка получения chat_id: {e}")
+            return {}
+    
     def get_admin_chat_ids(self) -> List[tuple]:
         """Получить chat_id всех администраторов"""
+        return [(telegram, chat_id) for telegram, chat_id, _ in self.get_admin_recipients()]
+    
+    def get_admin_recipients(self) -> List[tuple]:
+        """Получить (username, chat_id, режим уведомлений) всех администраторов"""
         try:
-            members = self.get_all_members()
-            admin_chat_ids = []
-            
-            for member in members:
-                if hasattr(member, 'is_admin') and member.is_admin and hasattr(member, 'chat_id') and member.chat_id:
-                    admin_chat_ids.append((member.telegram, member.chat_id))
-            
-            print(f"✅ Найдено администраторов с chat_id: {len(admin_chat_ids)}")
-            return admin_chat_ids
+            # Список считается в справочнике и сбрасывается только при изменении участников
+            return self._members().admin_recipients()
         except Exception as e:
             print(f"❌ Ошибка получения chat_id администраторов: {e}")
             return []
@@ -293,11 +311,17 @@ class FirebaseService:
                     status_dict[username] = task.status.value if hasattr(task.status, 'value') else str(task.status)
                 task_dict["status"] = status_dict
             
-            # Добавляем timestamp
+            # Добавляем timestamp и сортируемый дедлайн для запросов
             task_dict["updated_at"] = datetime.now().isoformat()
-            
-            result = self.db.child("tasks").push(task_dict)
-            task_id = result["name"]
+            task_dict["deadline_key"] = deadline_key(task.deadline)
+            
+            # Push ID генерируется локально, задание и индекс user_tasks пишутся одним запросом
+            task_id = self.db.generate_key()
+            updates = {f"tasks/{task_id}": task_dict}
+            for username, status in task_dict["status"].items():
+                updates[f"user_tasks/{username}/{task_id}"] = status
+            self.multi_update(updates)
+            self.task_store.upsert(task_id, task_dict)
             print(f"✅ Задание создано с ID: {task_id}")
             return task_id
         except Exception as e:
@@ -310,47 +334,20 @@ class FirebaseService:
         """Создать задание для нескольких пользователей"""
         return self.create_task(task)
     
+    def _tasks(self) -> TaskStore:
+        """Хранилище заданий (загружается одним запросом при необходимости)"""
+        if not self.task_store.is_fresh:
+            tasks_data = self.db.child("tasks").get().val()
+            self.task_store.load(tasks_data)
+        return self.task_store
+    
     def get_all_tasks(self) -> List[Task]:
         """Получить ВСЕ задания"""
         try:
-            tasks_data = self.db.child("tasks").get().val()
-            if not tasks_data:
+            result = self._tasks().all()
+            if not result:
                 print("📭 Нет задач в базе")
-                return []
-            
-            result = []
-            for task_id, task_data in tasks_data.items():
-                try:
-                    print(f"🔍 Обработка задачи {task_id}:")
-                    print(f"  Данные: {task_data}")
-                    
-                    # Обработка assigned_to
-                    if isinstance(task_data.get("assigned_to"), str):
-                        print(f"  Преобразую assigned_to из строки в список")
-                        task_data["assigned_to"] = [task_data["assigned_to"]]
-                    
-                    # Обработка статуса
-                    if not isinstance(task_data.get("status"), dict):
-                        print(f"  Статус не словарь: {task_data.get('status')}")
-                        if isinstance(task_data.get("assigned_to"), list) and task_data["assigned_to"]:
-                            print(f"  Создаю словарь статусов")
-                            status_dict = {}
-                            for username in task_data["assigned_to"]:
-                                status_dict[username] = task_data.get("status", TaskStatus.NOT_STARTED.value)
-                            task_data["status"] = status_dict
-                            print(f"  Новый статус: {status_dict}")
-                    
-                    task_data["id"] = task_id
-                    result.append(Task(**task_data))
-                    print(f"  ✅ Успешно преобразовано")
-                    
-                except Exception as e:
-                    print(f"⚠️  Ошибка парсинга задачи {task_id}: {e}")
-                    print(f"📊 Проблемные данные: {task_data}")
-            
-            print(f"✅ Итого загружено {len(result)} задач")
             return result
-        
         except Exception as e:
             print(f"❌ Критическая ошибка при получении всех задач: {e}")
             return []
@@ -358,22 +355,14 @@ class FirebaseService:
     def get_task(self, task_id: str) -> Optional[Task]:
         """Получить задание по ID"""
         try:
-            task_data = self.db.child("tasks").child(task_id).get().val()
-            if task_data:
-                # Обработка старых форматов
-                if isinstance(task_data.get("assigned_to"), str):
-                    task_data["assigned_to"] = [task_data["assigned_to"]]
-                
-                if not isinstance(task_data.get("status"), dict):
-                    if isinstance(task_data.get("assigned_to"), list) and task_data["assigned_to"]:
-                        status_dict = {}
-                        for username in task_data["assigned_to"]:
-                            status_dict[username] = task_data.get("status", TaskStatus.NOT_STARTED.value)
-                        task_data["status"] = status_dict
-                
-                task_data["id"] = task_id
-                return Task(**task_data)
-            return None
+            tasks = self._tasks()
+            if task_id not in tasks:
+                # Задание могло появиться в обход бота - читаем только его
+                task_data = self.db.child("tasks").child(task_id).get().val()
+                if not task_data:
+                    return None
+                tasks.upsert(task_id, task_data)
+            return tasks.get(task_id)
         except Exception as e:
             print(f"❌ Ошибка при получении задания: {e}")
             return None
@@ -381,32 +370,35 @@ class FirebaseService:
     def get_member_tasks(self, telegram_username: str) -> List[Task]:
         """Получить все задания для конкретного пользователя"""
         try:
-            all_tasks = self.get_all_tasks()
-            result = []
-            
-            for task in all_tasks:
-                if telegram_username in task.assigned_to:
-                    result.append(task)
-            
+            result = self._tasks().tasks_for(telegram_username)
             print(f"✅ Найдено {len(result)} задач для @{telegram_username}")
             return result
         except Exception as e:
             print(f"❌ Ошибка при получении заданий пользователя: {e}")
             return []
     
+    def get_member_task_page(self, telegram_username: str, page: int = 0, page_size: int = None) -> Tuple[List[Task], int]:
+        """Страница заданий пользователя (незавершенные первыми) и общее число заданий"""
+        try:
+            return self._tasks().page_for(telegram_username, page, page_size or config.TASKS_PAGE_SIZE)
+        except Exception as e:
+            print(f"❌ Ошибка при получении страницы заданий @{telegram_username}: {e}")
+            return [], 0
+    
     def update_task_status(self, task_id: str, username: str, status: TaskStatus) -> bool:
         """Обновить статус задания для конкретного пользователя"""
         try:
             # Преобразуем TaskStatus в строку
             status_str = status.value if hasattr(status, 'value') else str(status)
             
-            # Обновляем статус для конкретного пользователя
-            self.db.child("tasks").child(task_id).child("status").child(username).set(status_str)
-            
-            # Обновляем timestamp
-            self.db.child("tasks").child(task_id).update({
-                "updated_at": datetime.now().isoformat()
+            # Статус, timestamp и индекс user_tasks - одной атомарной записью
+            updated_at = datetime.now().isoformat()
+            self.multi_update({
+                f"tasks/{task_id}/status/{username}": status_str,
+                f"tasks/{task_id}/updated_at": updated_at,
+                f"user_tasks/{username}/{task_id}": status_str
             })
+            self.task_store.set_user_status(task_id, username, status_str, updated_at)
             
             print(f"✅ Статус задания {task_id} для @{username} обновлен на: {status_str}")
             return True
@@ -417,29 +409,32 @@ class FirebaseService:
     def get_task_status_for_user(self, task_id: str, username: str) -> Optional[TaskStatus]:
         """Получить статус задания для конкретного пользователя"""
         try:
-            task_data = self.db.child("tasks").child(task_id).get().val()
-            if task_data and "status" in task_data and username in task_data["status"]:
-                return TaskStatus(task_data["status"][username])
+            task = self.get_task(task_id)
+            if task and username in task.status:
+                return TaskStatus(task.status[username])
             return None
         except Exception as e:
             print(f"❌ Ошибка при получении статуса: {e}")
             return None
     
-    def add_task_comment(self, task_id: str, comment: str) -> bool:
-        """Добавить комментарий к заданию"""
+    def add_task_comment(self, task_id: str, comment: str, author: str = "") -> bool:
+        """Добавить комментарий к заданию (отдельный дочерний узел, без чтения старых)"""
         try:
-            # Получаем текущие комментарии
-            task_data = self.db.child("tasks").child(task_id).get().val()
-            comments = task_data.get("comments", []) if task_data else []
-            
-            # Добавляем новый комментарий
-            comments.append(comment)
+            if not self.get_task(task_id):
+                print(f"⚠️  Задание {task_id} не найдено")
+                return False
             
-            # Обновляем в базе
-            self.db.child("tasks").child(task_id).update({
-                "comments": comments,
-                "updated_at": datetime.now().isoformat()
+            comment_id = self.db.generate_key()
+            updated_at = datetime.now().isoformat()
+            self.multi_update({
+                f"task_comments/{task_id}/{comment_id}": {
+                    "author": author,
+                    "text": comment,
+                    "created_at": updated_at
+                },
+                f"tasks/{task_id}/updated_at": updated_at
             })
+            self.task_store.touch(task_id, updated_at)
             
             print(f"✅ Комментарий добавлен к заданию {task_id}")
             return True
@@ -447,8 +442,145 @@ class FirebaseService:
             print(f"❌ Ошибка при добавлении комментария: {e}")
             return False
     
+    def get_task_comments(self, task_id: str, limit: int = 10, before: Optional[str] = None) -> Tuple[List[TaskComment], Optional[str]]:
+        """Страница комментариев (новые первыми) и курсор для следующей страницы"""
+        try:
+            query = self.db.child("task_comments").child(task_id).order_by_key()
+            if before:
+                # end_at включает сам курсор - запрашиваем на один больше
+                query = query.end_at(before).limit_to_last(limit + 2)
+            else:
+                query = query.limit_to_last(limit + 1)
+            result = query.get().val()
+            
+            items = list(result.items()) if isinstance(result, dict) else []
+            items = [(key, value) for key, value in items if key != before and isinstance(value, dict)]
+            has_more = len(items) > limit
+            items = items[-limit:]
+            
+            comments = [TaskComment(id=key, **value) for key, value in reversed(items)]
+            next_cursor = items[0][0] if has_more and items else None
+            return comments, next_cursor
+        except Exception as e:
+            print(f"❌ Ошибка при получении комментариев: {e}")
+            return [], None
+    
+    # ============== ИНДЕКСНЫЕ ЗАПРОСЫ (без загрузки всего узла) ==============
+    
+    def query_member_by_telegram(self, telegram_username: str) -> Optional[Member]:
+        """Найти участника запросом orderByChild("telegram").equalTo(...) по нормализованному username"""
+        telegram_username = username_key(telegram_username)
+        try:
+            result = self.db.child("members").order_by_child("telegram").equal_to(telegram_username).limit_to_first(1).get().val()
+            if not result:
+                return None
+            member_id, member_data = next(iter(result.items()))
+            self.member_directory.upsert(member_id, member_data)
+            return member_from_data(member_id, member_data)
+        except Exception as e:
+            print(f"❌ Ошибка запроса участника @{telegram_username}: {e}")
+            return None
+    
+    def get_member_task_ids(self, telegram_username: str, status: Optional[TaskStatus] = None) -> List[str]:
+        """ID заданий пользователя из индекса user_tasks (опционально с фильтром по статусу)"""
+        try:
+            query = self.db.child("user_tasks").child(telegram_username)
+            if status is not None:
+                status_str = status.value if hasattr(status, 'value') else str(status)
+                query = query.order_by_value().equal_to(status_str)
+            result = query.get().val()
+            return list(result.keys()) if isinstance(result, dict) else []
+        except Exception as e:
+            print(f"❌ Ошибка чтения user_tasks для @{telegram_username}: {e}")
+            return []
+    
+    def query_member_tasks(self, telegram_username: str, status: Optional[TaskStatus] = None) -> List[Task]:
+        """Задания пользователя через индекс user_tasks: объем данных O(результата)"""
+        result = []
+        for task_id in self.get_member_task_ids(telegram_username, status):
+            task = self.get_task(task_id)
+            if task:
+                result.append(task)
+        return result
+    
+    def query_tasks_by_deadline(self, date_from: str, date_to: str, limit: Optional[int] = None) -> List[Task]:
+        """Задания с дедлайном в диапазоне дат ГГГГ-ММ-ДД (orderByChild("deadline_key"))"""
+        try:
+            query = self.db.child("tasks").order_by_child("deadline_key").start_at(date_from).end_at(date_to)
+            if limit:
+                query = query.limit_to_first(limit)
+            result = query.get().val()
+            if not isinstance(result, dict):
+                return []
+            tasks = []
+            for task_id, task_data in result.items():
+                self.task_store.upsert(task_id, task_data)
+                task = task_from_data(task_id, task_data)
+                if task:
+                    tasks.append(task)
+            return tasks
+        except Exception as e:
+            print(f"❌ Ошибка запроса заданий по дедлайну: {e}")
+            return []
+    
     # ============== МЕТОДЫ ДЛЯ МИГРАЦИИ ==============
     
+    def ensure_task_indexes(self) -> bool:
+        """Один раз построить индексы для существующих заданий (флаг meta/task_indexes_version)"""
+        try:
+            version = self.db.child("meta").child("task_indexes_version").get().val()
+            if version is not None and int(version) >= TASK_INDEXES_VERSION:
+                return True
+            if not self.migrate_user_tasks_index():
+                return False
+            self.db.child("meta").child("task_indexes_version").set(TASK_INDEXES_VERSION)
+            return True
+        except Exception as e:
+            print(f"❌ Ошибка проверки индексов заданий: {e}")
+            return False
+    
+    def migrate_user_tasks_index(self) -> bool:
+        """Достроить индекс user_tasks и deadline_key по существующим заданиям"""
+        try:
+            tasks_data = self.db.child("tasks").get().val()
+            if not tasks_data:
+                print("📭 Нет заданий для индексации")
+                return True
+            
+            user_tasks = {}
+            deadline_keys = {}
+            for task_id, task_data in tasks_data.items():
+                task = task_from_data(task_id, task_data)
+                if not task:
+                    continue
+                for username, status in task.status.items():
+                    status_str = status.value if hasattr(status, 'value') else str(status)
+                    user_tasks.setdefault(username, {})[task_id] = status_str
+                key = deadline_key(task.deadline)
+                if key and task_data.get("deadline_key") != key:
+                    deadline_keys[f"{task_id}/deadline_key"] = key
+            
+            # Точечные пути, а не set() всего узла: записи новых заданий, появившиеся
+            # во время миграции, не затираются
+            index_paths = {
+                f"{username}/{task_id}": status_str
+                for username, statuses in user_tasks.items()
+                for task_id, status_str in statuses.items()
+            }
+            if index_paths:
+                self.db.child("user_tasks").update(index_paths)
+            if deadline_keys:
+                self.db.child("tasks").update(deadline_keys)
+            self.task_store.invalidate()
+            print(f"🎯 Индекс user_tasks построен для {len(user_tasks)} пользователей, "
+                  f"deadline_key добавлен {len(deadline_keys)} заданиям")
+            return True
+        except Exception as e:
+            print(f"❌ Ошибка построения индекса user_tasks: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+    
     def migrate_old_tasks(self):
         """Мигрировать старые задания в новый формат"""
         try:
@@ -483,6 +615,7 @@ class FirebaseService:
                     if needs_migration:
                         # Обновляем задание
                         self.db.child("tasks").child(task_id).set(task_data)
+                        self.task_store.upsert(task_id, task_data)
                         migrated_count += 1
                         print(f"✅ Мигрировано задание {task_id}")
                         
@@ -499,57 +632,171 @@ class FirebaseService:
     # ============== ВСПОМОГАТЕЛЬНЫЕ МЕТОДЫ ==============
     
     def count_tasks_by_status(self):
-        """Посчитать задачи по статусам"""
+        """Посчитать задачи по статусам (из сводки, без перебора заданий)"""
         try:
-            tasks = self.get_all_tasks()
-            stats = {
-                "total": 0,
-                "not_started": 0,
-                "in_progress": 0,
-                "completed": 0,
-                "by_user": {}
+            self._tasks()
+            summary = task_stats.summary()
+            return {
+                "total": summary["tasks"],
+                "not_started": summary["not_started"],
+                "in_progress": summary["in_progress"],
+                "completed": summary["completed"],
+                "by_user": task_stats.by_user()
             }
-            
-            for task in tasks:
-                stats["total"] += 1
-                
-                # Считаем по пользователям
-                for username, status in task.status.items():
-                    if isinstance(status, TaskStatus):
-                        status_value = status.value
-                    else:
-                        status_value = status
-                    
-                    if status_value == TaskStatus.NOT_STARTED.value:
-                        stats["not_started"] += 1
-                    elif status_value == TaskStatus.IN_PROGRESS.value:
-                        stats["in_progress"] += 1
-                    elif status_value == TaskStatus.COMPLETED.value:
-                        stats["completed"] += 1
-                    
-                    # Статистика по пользователям
-                    if username not in stats["by_user"]:
-                        stats["by_user"][username] = {
-                            "total": 0,
-                            "not_started": 0,
-                            "in_progress": 0,
-                            "completed": 0
-                        }
-                    
-                    stats["by_user"][username]["total"] += 1
-                    if status_value == TaskStatus.NOT_STARTED.value:
-                        stats["by_user"][username]["not_started"] += 1
-                    elif status_value == TaskStatus.IN_PROGRESS.value:
-                        stats["by_user"][username]["in_progress"] += 1
-                    elif status_value == TaskStatus.COMPLETED.value:
-                        stats["by_user"][username]["completed"] += 1
-            
-            return stats
-            
         except Exception as e:
             print(f"❌ Ошибка подсчета статистики: {e}")
             return None
+    
+    def get_status_summary(self) -> Optional[Dict[str, int]]:
+        """Итоги по статусам для отчета «Статус заданий»"""
+        try:
+            self._tasks()
+            return task_stats.summary()
+        except Exception as e:
+            print(f"❌ Ошибка получения сводки статусов: {e}")
+            return None
+    
+    def get_status_page(self, status: str, page: int = 0, page_size: int = None) -> Tuple[List[Tuple[str, str, str]], int]:
+        """Страница назначений в статусе: ([(task_id, название, username)], всего)"""
+        try:
+            self._tasks()
+            return task_stats.page(status, page, page_size or config.STATUS_PAGE_SIZE)
+        except Exception as e:
+            print(f"❌ Ошибка получения назначений в статусе {status}: {e}")
+            return [], 0
+
+
+class AsyncFirebaseService:
+    """Асинхронный доступ к FirebaseService: блокирующие запросы выполняются
+    в отдельном ограниченном пуле потоков и не останавливают цикл событий бота"""
+    
+    def __init__(self, service: FirebaseService, max_workers: int = 8):
+        self.service = service
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="firebase")
+    
+    async def _run(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(method, *args, **kwargs))
+    
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+    
+    def get_http_stats(self) -> List[Dict[str, Any]]:
+        return self.service.get_http_stats()
+    
+    async def multi_update(self, updates: Dict[str, Any]):
+        return await self._run(self.service.multi_update, updates)
+    
+    # ============== МЕТОДЫ ДЛЯ УЧАСТНИКОВ ==============
+    
+    async def get_member_by_telegram(self, telegram_username: str) -> Optional[Member]:
+        return await self._run(self.service.get_member_by_telegram, telegram_username)
+    
+    async def get_member(self, member_id: str) -> Optional[Member]:
+        return await self._run(self.service.get_member, member_id)
+    
+    async def get_member_by_chat_id(self, chat_id: int) -> Optional[Member]:
+        return await self._run(self.service.get_member_by_chat_id, chat_id)
+    
+    async def get_all_members(self) -> List[Member]:
+        return await self._run(self.service.get_all_members)
+    
+    async def allocate_member_id(self) -> Optional[str]:
+        return await self._run(self.service.allocate_member_id)
+    
+    async def save_member(self, member_id: str, member: Member) -> bool:
+        return await self._run(self.service.save_member, member_id, member)
+    
+    async def update_member(self, member_id: str, fields: Dict[str, Any]) -> bool:
+        return await self._run(self.service.update_member, member_id, fields)
+    
+    async def update_member_chat_id(self, member_id: str, chat_id: int) -> bool:
+        return await self._run(self.service.update_member_chat_id, member_id, chat_id)
+    
+    async def get_chat_id_by_username(self, telegram_username: str) -> Optional[int]:
+        return await self._run(self.service.get_chat_id_by_username, telegram_username)
+    
+    async def get_member_chat_id(self, telegram_username: str) -> Optional[int]:
+        return await self._run(self.service.get_member_chat_id, telegram_username)
+    
+    async def get_chat_ids(self, usernames: List[str]) -> Dict[str, int]:
+        return await self._run(self.service.get_chat_ids, usernames)
+    
+    async def get_admin_chat_ids(self) -> List[tuple]:
+        return await self._run(self.service.get_admin_chat_ids)
+    
+    async def get_admin_recipients(self) -> List[tuple]:
+        return await self._run(self.service.get_admin_recipients)
+    
+    # ============== МЕТОДЫ ДЛЯ ЗАДАНИЙ ==============
+    
+    async def create_task(self, task: Union[Task, SingleUserTask]) -> Optional[str]:
+        return await self._run(self.service.create_task, task)
+    
+    async def create_multi_user_task(self, task: Task) -> Optional[str]:
+        return await self._run(self.service.create_multi_user_task, task)
+    
+    async def get_all_tasks(self) -> List[Task]:
+        return await self._run(self.service.get_all_tasks)
+    
+    async def get_task(self, task_id: str) -> Optional[Task]:
+        return await self._run(self.service.get_task, task_id)
+    
+    async def get_member_tasks(self, telegram_username: str) -> List[Task]:
+        return await self._run(self.service.get_member_tasks, telegram_username)
+    
+    async def get_member_task_page(self, telegram_username: str, page: int = 0, page_size: int = None) -> Tuple[List[Task], int]:
+        return await self._run(self.service.get_member_task_page, telegram_username, page, page_size)
+    
+    async def update_task_status(self, task_id: str, username: str, status: TaskStatus) -> bool:
+        return await self._run(self.service.update_task_status, task_id, username, status)
+    
+    async def get_task_status_for_user(self, task_id: str, username: str) -> Optional[TaskStatus]:
+        return await self._run(self.service.get_task_status_for_user, task_id, username)
+    
+    async def add_task_comment(self, task_id: str, comment: str, author: str = "") -> bool:
+        return await self._run(self.service.add_task_comment, task_id, comment, author)
+    
+    async def get_task_comments(self, task_id: str, limit: int = 10, before: Optional[str] = None) -> Tuple[List[TaskComment], Optional[str]]:
+        return await self._run(self.service.get_task_comments, task_id, limit, before)
+    
+    # ============== ИНДЕКСНЫЕ ЗАПРОСЫ ==============
+    
+    async def query_member_by_telegram(self, telegram_username: str) -> Optional[Member]:
+        return await self._run(self.service.query_member_by_telegram, telegram_username)
+    
+    async def get_member_task_ids(self, telegram_username: str, status: Optional[TaskStatus] = None) -> List[str]:
+        return await self._run(self.service.get_member_task_ids, telegram_username, status)
+    
+    async def query_member_tasks(self, telegram_username: str, status: Optional[TaskStatus] = None) -> List[Task]:
+        return await self._run(self.service.query_member_tasks, telegram_username, status)
+    
+    async def query_tasks_by_deadline(self, date_from: str, date_to: str, limit: Optional[int] = None) -> List[Task]:
+        return await self._run(self.service.query_tasks_by_deadline, date_from, date_to, limit)
+    
+    # ============== МЕТОДЫ ДЛЯ МИГРАЦИИ ==============
+    
+    async def ensure_task_indexes(self) -> bool:
+        return await self._run(self.service.ensure_task_indexes)
+    
+    async def migrate_user_tasks_index(self) -> bool:
+        return await self._run(self.service.migrate_user_tasks_index)
+    
+    async def migrate_old_tasks(self):
+        return await self._run(self.service.migrate_old_tasks)
+    
+    # ============== ВСПОМОГАТЕЛЬНЫЕ МЕТОДЫ ==============
+    
+    async def count_tasks_by_status(self):
+        return await self._run(self.service.count_tasks_by_status)
+    
+    async def get_status_summary(self) -> Optional[Dict[str, int]]:
+        return await self._run(self.service.get_status_summary)
+    
+    async def get_status_page(self, status: str, page: int = 0, page_size: int = None) -> Tuple[List[Tuple[str, str, str]], int]:
+        return await self._run(self.service.get_status_page, status, page, page_size)
 
 
-# Создаем глобальный экземпляр
-firebase_service = FirebaseService()
\ No newline at end of file
+# Создаем глобальные экземпляры
+firebase_service = FirebaseService()
+async_firebase_service = AsyncFirebaseService(firebase_service, max_workers=config.FIREBASE_MAX_WORKERS)
@@ -1,25 +1,34 @@
 from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
 from telegram.ext import ContextTypes, ConversationHandler, CommandHandler, MessageHandler, filters, CallbackQueryHandler
-from firebase_service import FirebaseService
-from models import Task, TaskAssignment, TaskStatus, UserRole, Member
+from firebase_service import async_firebase_service
+from models import Task, TaskAssignment, UserRole, Member, NotifyMode, DeliveryReport
 from config import config  # ⬅️ ЭТО ОЧЕНЬ ВАЖНО ДОБАВИТЬ!
+import callbacks
+from rendering import render_member_card, render_broadcast_progress, render_status_summary, render_status_page
 from datetime import datetime
-import html
+from telegram.error import TelegramError, BadRequest
 import re
+import time
 from keyboards import (
     get_main_menu_keyboard, 
     get_members_keyboard, 
     get_task_selection_keyboard, 
     get_cancel_keyboard,
-    get_multi_member_selection_keyboard
+    get_multi_member_selection_keyboard,
+    get_broadcast_targets_keyboard,
+    get_broadcast_confirm_keyboard,
+    get_status_summary_keyboard,
+    get_status_page_keyboard
 )
 
 # States для ConversationHandler
 ASSIGN_TASK, SELECT_MEMBER, TASK_DETAILS = range(3)
 ADD_MEMBER, GET_TELEGRAM, GET_NAME_RU, GET_NAME_EN, GET_GROUP, GET_PERSONALITY, GET_BIRTHDATE, GET_ROLE = range(8)
 MULTI_SELECT_MEMBERS, MULTI_TASK_DETAILS = range(10, 12)
+BROADCAST_TARGET, BROADCAST_TEXT, BROADCAST_CONFIRM = range(20, 23)
 
-firebase_service = FirebaseService()
+# Как часто обновлять сообщение с прогрессом рассылки (секунды)
+BROADCAST_PROGRESS_INTERVAL = 2
 
 # В начале файла
 async def admin_dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -60,7 +69,7 @@ async def get_member_telegram(update: Update, context: ContextTypes.DEFAULT_TYPE
         telegram_username = telegram_username[1:]
     
     # Проверяем, существует ли уже такой пользователь
-    existing_member = firebase_service.get_member_by_telegram(telegram_username)
+    existing_member = await async_firebase_service.get_member_by_telegram(telegram_username)
     if existing_member:
         await update.message.reply_text(
             f"❌ Пользователь @{telegram_username} уже существует!\n"
@@ -232,10 +241,12 @@ async def get_member_role(update: Update, context: ContextTypes.DEFAULT_TYPE):
         member = Member(**member_data)
         
         # Сохраняем в Firebase
-        members = firebase_service.db.child("members").get().val() or {}
-        new_member_id = f"member_{len(members) + 1:03d}"
+        new_member_id = await async_firebase_service.allocate_member_id()
+        if not new_member_id:
+            raise RuntimeError("не удалось выделить ID участника")
         
-        firebase_service.db.child("members").child(new_member_id).set(member.dict(exclude={"id"}))
+        if not await async_firebase_service.save_member(new_member_id, member):
+            raise RuntimeError("не удалось сохранить участника в Firebase")
         
         # Отправляем подтверждение
         confirmation_text = (
@@ -320,7 +331,7 @@ async def admin_dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def show_all_members(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показать всех членов клуба"""
-    members = firebase_service.get_all_members()
+    members = await async_firebase_service.get_all_members()
     
     if not members:
         await update.message.reply_text("Список членов клуба пуст.")
@@ -328,39 +339,43 @@ async def show_all_members(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await update.message.reply_text(
         "Выберите члена клуба для просмотра информации:",
-        reply_markup=get_members_keyboard(members, "member_info")
+        reply_markup=get_members_keyboard(members, callbacks.MEMBER_INFO)
     )
 
-async def assign_task_multi_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Начать процесс выдачи задания нескольким людям"""
+async def notify_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Настройка режима уведомлений об изменении статусов: /notify instant|batched|daily"""
     if not context.user_data.get("is_admin"):
         await update.message.reply_text("У вас нет прав администратора.")
         return
     
-    members = firebase_service.get_all_members()
-    non_admin_members = [m for m in members if not m.is_admin]
-    
-    if not non_admin_members:
-        await update.message.reply_text("❌ Нет доступных участников.")
+    member = await async_firebase_service.get_member_by_telegram(context.user_data.get("telegram_username", ""))
+    if not member:
+        await update.message.reply_text("❌ Не удалось найти вас в базе участников.")
         return
     
-    # Инициализируем список выбранных пользователей
-    context.user_data["selected_users"] = []
-    context.user_data["available_members"] = [m.telegram_username for m in non_admin_members]
+    mode_names = {
+        NotifyMode.INSTANT.value: "каждое изменение сразу",
+        NotifyMode.BATCHED.value: f"сводка раз в {int(config.DIGEST_WINDOW_SECONDS // 60)} мин",
+        NotifyMode.DAILY.value: f"одна сводка в день в {config.DIGEST_DAILY_HOUR}:00"
+    }
     
-    # Отправляем сообщение с клавиатурой выбора
-    message = await update.message.reply_text(
-        "👥 *Выберите участников для задания*\n\n"
-        "Нажмите на имя чтобы выбрать/отменить выбор.\n"
-        "Нажмите '✅ Готово' когда выберете всех.",
-        parse_mode='Markdown',
-        reply_markup=get_multi_member_selection_keyboard(non_admin_members)
-    )
+    if not context.args:
+        current = member.notify_mode if member.notify_mode in mode_names else config.ADMIN_NOTIFY_MODE
+        options = "\n".join(f"/notify {mode} - {name}" for mode, name in mode_names.items())
+        await update.message.reply_text(
+            f"🔔 Текущий режим: {current} ({mode_names.get(current, current)})\n\n{options}"
+        )
+        return
     
-    # Сохраняем message_id для последующего редактирования
-    context.user_data["selection_message_id"] = message.message_id
+    mode = context.args[0].strip().lower()
+    if mode not in mode_names:
+        await update.message.reply_text("❌ Неизвестный режим. Доступно: instant, batched, daily")
+        return
     
-    return MULTI_SELECT_MEMBERS
+    if await async_firebase_service.update_member(member.id, {"notify_mode": mode}):
+        await update.message.reply_text(f"✅ Режим уведомлений: {mode} ({mode_names[mode]})")
+    else:
+        await update.message.reply_text("❌ Не удалось сохранить настройку.")
 
 async def assign_task_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начать процесс выдачи задания - ИСПРАВЛЕННАЯ ВЕРСИЯ"""
@@ -368,7 +383,7 @@ async def assign_task_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("У вас нет прав администратора.")
         return
     
-    members = firebase_service.get_all_members()
+    members = await async_firebase_service.get_all_members()
     
     if not members:
         await update.message.reply_text("❌ В базе данных нет членов клуба.")
@@ -422,7 +437,7 @@ async def assign_task_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await update.message.reply_text(
         f"Выберите кому назначить задание (доступно: {len(non_admin_members)} участников):",
-        reply_markup=get_members_keyboard(non_admin_members, "assign_to")
+        reply_markup=get_members_keyboard(non_admin_members, callbacks.ASSIGN_TO)
     )
     
     return SELECT_MEMBER
@@ -433,8 +448,9 @@ async def select_member_for_task(update: Update, context: ContextTypes.DEFAULT_T
     query = update.callback_query
     await query.answer()
     
-    if query.data.startswith("assign_to_"):
-        member_username = query.data.replace("assign_to_", "")
+    op, args = callbacks.decode(query.data) or (None, [])
+    if op == callbacks.ASSIGN_TO and args:
+        member_username = args[0]
         context.user_data["assign_to"] = member_username
         
         await query.edit_message_text(
@@ -445,118 +461,62 @@ async def select_member_for_task(update: Update, context: ContextTypes.DEFAULT_T
         return TASK_DETAILS
 
 async def view_tasks_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Просмотр статусов всех заданий - РАБОЧАЯ версия"""
+    """Сводка статусов всех заданий (по готовым счетчикам)"""
     if not context.user_data.get("is_admin"):
         await update.message.reply_text("У вас нет прав администратора.")
         return
     
-    print(f"⏱️  Начало view_tasks_status")
+    summary = await async_firebase_service.get_status_summary()
     
-    try:
-        # Получаем все задачи
-        all_tasks = firebase_service.get_all_tasks()
-        
-        if not all_tasks:
-            await update.message.reply_text("📭 Нет активных заданий.")
-            return
-        
-        print(f"✅ Загружено задач: {len(all_tasks)}")
-        
-        # Отладочная информация
-        for task in all_tasks:
-            print(f"🔍 Задание: {task.title}")
-            print(f"  ID: {task.id}")
-            print(f"  Assigned to: {task.assigned_to}")
-            print(f"  Status type: {type(task.status)}")
-            print(f"  Status value: {task.status}")
-        
-        # Группируем по статусу
-        tasks_by_status = {
-            "not_started": [],
-            "in_progress": [],
-            "completed": []
-        }
-        
-        # Собираем все задачи с деталями
-        for task in all_tasks:
-            if isinstance(task.status, dict):
-                # Новый формат: словарь статусов
-                for username, status_value in task.status.items():
-                    if isinstance(status_value, TaskStatus):
-                        status_str = status_value.value
-                    else:
-                        status_str = str(status_value)
-                    
-                    if status_str in tasks_by_status:
-                        tasks_by_status[status_str].append({
-                            "task": task,
-                            "username": username,
-                            "status": status_str
-                        })
-            else:
-                # Старый формат
-                if isinstance(task.status, TaskStatus):
-                    status_str = task.status.value
-                else:
-                    status_str = str(task.status)
-                
-                if status_str in tasks_by_status:
-                    # Для старых заданий берем первого пользователя
-                    username = task.assigned_to[0] if task.assigned_to else "unknown"
-                    tasks_by_status[status_str].append({
-                        "task": task,
-                        "username": username,
-                        "status": status_str
-                    })
-        
-        # Формируем отчет
-        report = "<b>📊 Статус всех заданий:</b>\n\n"
-        
-        status_display = {
-            "not_started": ("🟡 Не начато", "not_started"),
-            "in_progress": ("🟠 В процессе", "in_progress"),
-            "completed": ("🟢 Завершено", "completed")
-        }
-        
-        total_shown = 0
-        
-        for display_name, status_key in status_display.values():
-            tasks_list = tasks_by_status.get(status_key, [])
-            
-            report += f"<b>{display_name}</b> ({len(tasks_list)}):\n"
-            
-            if tasks_list:
-                for item in tasks_list[:15]:  # Ограничим 15 заданиями на статус
-                    task = item["task"]
-                    username = item["username"]
-                    
-                    # Экранируем HTML
-                    safe_title = html.escape(task.title) if hasattr(html, 'escape') else task.title
-                    safe_username = html.escape(username) if hasattr(html, 'escape') else username
-                    
-                    report += f"• {safe_title} (@{safe_username})\n"
-                    total_shown += 1
-                
-                if len(tasks_list) > 15:
-                    report += f"... и еще {len(tasks_list) - 15} заданий\n"
-            else:
-                report += "Нет заданий\n"
-            
-            report += "\n"
-        
-        report += f"<b>📈 Всего заданий в системе:</b> {len(all_tasks)}\n"
-        report += f"<b>👥 Уникальных исполнителей:</b> {len(set(item['username'] for status_list in tasks_by_status.values() for item in status_list))}\n"
-        report += f"<b>👁️ Показано:</b> {total_shown} заданий"
-        
-        print(f"✅ Отчет сформирован")
-        
-        await update.message.reply_text(report, parse_mode='HTML')
-        
-    except Exception as e:
-        print(f"❌ Ошибка в view_tasks_status: {e}")
-        import traceback
-        traceback.print_exc()
+    if summary is None:
         await update.message.reply_text("❌ Ошибка при получении статуса заданий.")
+        return
+    
+    if not summary["tasks"]:
+        await update.message.reply_text("📭 Нет активных заданий.")
+        return
+    
+    await update.message.reply_text(
+        render_status_summary(summary),
+        parse_mode='HTML',
+        reply_markup=get_status_summary_keyboard(summary)
+    )
+
+async def view_tasks_status_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, status_code: str = "", page: str = "0"):
+    """Листание отчета «Статус заданий»: без кода статуса - сводка, иначе страница назначений"""
+    query = update.callback_query
+    await query.answer()
+    
+    if not context.user_data.get("is_admin"):
+        await query.edit_message_text("У вас нет прав администратора.")
+        return
+    
+    if not status_code:
+        summary = await async_firebase_service.get_status_summary()
+        if summary is None:
+            await query.edit_message_text("❌ Ошибка при получении статуса заданий.")
+            return
+        text, reply_markup = render_status_summary(summary), get_status_summary_keyboard(summary)
+    else:
+        status = callbacks.STATUSES_BY_CODE.get(status_code)
+        if status is None or not page.isdigit():
+            await query.edit_message_text("❌ Неизвестный запрос")
+            return
+        page = int(page)
+        page_size = config.STATUS_PAGE_SIZE
+        items, total = await async_firebase_service.get_status_page(status, page, page_size)
+        if not items and page > 0:
+            # Пока листали, назначения сменили статус - показываем последнюю страницу
+            page = max(0, (total - 1) // page_size)
+            items, total = await async_firebase_service.get_status_page(status, page, page_size)
+        text = render_status_page(status, items, page, total, page_size)
+        reply_markup = get_status_page_keyboard(status, page, total, page_size)
+    
+    try:
+        await query.edit_message_text(text, parse_mode='HTML', reply_markup=reply_markup)
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():
+            raise
 
 async def assign_task_multi_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начать процесс выдачи задания нескольким людям"""
@@ -564,66 +524,106 @@ async def assign_task_multi_start(update: Update, context: ContextTypes.DEFAULT_
         await update.message.reply_text("У вас нет прав администратора.")
         return
     
-    members = firebase_service.get_all_members()
-    non_admin_members = [m for m in members if not m.is_admin]
+    members = await async_firebase_service.get_all_members()
     
-    if not non_admin_members:
+    # Снимок участников на всю сессию выбора: переключения больше не обращаются к базе
+    available_members = [
+        (m.telegram_username, m.full_name_ru)
+        for m in members if not m.is_admin and m.telegram_username
+    ]
+    
+    if not available_members:
         await update.message.reply_text("❌ Нет доступных участников.")
         return
     
-    # Инициализируем список выбранных пользователей
-    context.user_data["selected_users"] = []
-    context.user_data["available_members"] = [m.telegram_username for m in non_admin_members]
+    context.user_data["available_members"] = available_members
+    context.user_data["selected_users"] = set()
+    context.user_data["selection_page"] = 0
     
     await update.message.reply_text(
         "👥 *Выберите участников для задания*\n\n"
         "Нажмите на имя чтобы выбрать/отменить выбор.\n"
         "Нажмите '✅ Готово' когда выберете всех.",
         parse_mode='Markdown',
-        reply_markup=get_multi_member_selection_keyboard(non_admin_members)
+        reply_markup=get_multi_member_selection_keyboard(available_members)
     )
     
     return MULTI_SELECT_MEMBERS
 
 
+async def _update_selection_keyboard(query, context: ContextTypes.DEFAULT_TYPE):
+    """Перерисовать клавиатуру выбора по снимку сессии"""
+    try:
+        await query.edit_message_reply_markup(
+            reply_markup=get_multi_member_selection_keyboard(
+                context.user_data.get("available_members", []),
+                context.user_data.get("selected_users", set()),
+                context.user_data.get("selection_page", 0)
+            )
+        )
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():
+            print(f"❌ Ошибка обновления клавиатуры: {e}")
+
+
 async def handle_multi_user_toggle(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработка выбора/отмены выбора пользователя"""
     query = update.callback_query
     await query.answer()
     
-    if query.data.startswith("toggle_user_"):
-        username = query.data.replace("toggle_user_", "")
-        selected_users = context.user_data.get("selected_users", [])
+    op, args = callbacks.decode(query.data) or (None, [])
+    if op == callbacks.TOGGLE_USER and args:
+        username = args[0]
+        selected_users = context.user_data.setdefault("selected_users", set())
         
         if username in selected_users:
             # Удаляем если уже выбран
-            selected_users.remove(username)
-        else:
-            # Добавляем если не выбран
-            selected_users.append(username)
-        
-        context.user_data["selected_users"] = selected_users
+            selected_users.discard(username)
+        elif any(username == member for member, _ in context.user_data.get("available_members", [])):
+            # Добавляем только участников из снимка сессии
+            selected_users.add(username)
         
-        # Обновляем клавиатуру
-        members = firebase_service.get_all_members()
-        non_admin_members = [m for m in members if not m.is_admin]
-        
-        try:
-            await query.edit_message_reply_markup(
-                reply_markup=get_multi_member_selection_keyboard(
-                    non_admin_members, 
-                    selected_users
-                )
-            )
-        except Exception as e:
-            print(f"❌ Ошибка обновления клавиатуры: {e}")
+        await _update_selection_keyboard(query, context)
+
+
+async def handle_multi_select_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Переход на другую страницу списка участников"""
+    query = update.callback_query
+    await query.answer()
+    
+    op, args = callbacks.decode(query.data) or (None, [])
+    try:
+        page = int(args[0])
+    except (IndexError, ValueError):
+        return
+    
+    if page == context.user_data.get("selection_page", 0):
+        return
+    context.user_data["selection_page"] = max(0, page)
+    await _update_selection_keyboard(query, context)
+
+
+def _selected_in_order(context: ContextTypes.DEFAULT_TYPE):
+    """Выбранные участники в порядке списка"""
+    selected_users = context.user_data.get("selected_users", set())
+    return [username for username, _ in context.user_data.get("available_members", []) if username in selected_users]
+
+
+async def show_multi_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показать выбранных участников во всплывающем окне"""
+    query = update.callback_query
+    selected = _selected_in_order(context)
+    text = "Выбраны:\n" + "\n".join(f"@{user}" for user in selected) if selected else "Никто не выбран"
+    # Лимит текста всплывающего окна - 200 символов
+    await query.answer(text[:200], show_alert=True)
+
 
 async def confirm_multi_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Подтверждение выбора нескольких пользователей"""
     query = update.callback_query
     await query.answer()
     
-    selected_users = context.user_data.get("selected_users", [])
+    selected_users = _selected_in_order(context)
     
     if not selected_users:
         await query.edit_message_text("❌ Не выбрано ни одного участника.")
@@ -655,7 +655,7 @@ async def get_multi_task_details(update: Update, context: ContextTypes.DEFAULT_T
         deadline = update.message.text
         deadline = None if deadline.lower() == 'нет' else deadline
         
-        selected_users = context.user_data.get("selected_users", [])
+        selected_users = _selected_in_order(context)
         admin_username = context.user_data.get("telegram_username", "admin")
         
         # Создаем задание для нескольких пользователей
@@ -670,23 +670,17 @@ async def get_multi_task_details(update: Update, context: ContextTypes.DEFAULT_T
             status={}  # Будет заполнено автоматически
         )
         
-        task_id = firebase_service.create_multi_user_task(task)
+        task_id = await async_firebase_service.create_multi_user_task(task)
         
         if task_id:
             print(f"✅ Многопользовательское задание создано: {task_id}")
             
             # Отправляем уведомления всем выбранным участникам
             from notifications import notification_service
-            import asyncio
+            from jobs import job_runtime
             
-            for username in selected_users:
-                # Создаем копию задания для каждого пользователя
-                user_task = task.copy()
-                user_task.assigned_to = username
-                
-                asyncio.create_task(
-                    notification_service.notify_member_new_task(firebase_service, user_task)
-                )
+            # Одно уведомление на всех: chat_id разрешаются одним обращением к справочнику
+            job_runtime.submit("notifications", notification_service.notify_member_new_task, async_firebase_service, task)
             
             # Сообщение администратору
             await update.message.reply_text(
@@ -703,6 +697,7 @@ async def get_multi_task_details(update: Update, context: ContextTypes.DEFAULT_T
             context.user_data.pop("task_description", None)
             context.user_data.pop("selected_users", None)
             context.user_data.pop("available_members", None)
+            context.user_data.pop("selection_page", None)
             
         else:
             await update.message.reply_text("❌ Ошибка при создании задания")
@@ -735,7 +730,7 @@ async def cancel_assignment(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         # Очищаем временные данные
         for key in ["task_title", "task_description", "assign_to", 
-                   "selected_users", "available_members", "selection_message_id"]:
+                   "selected_users", "available_members", "selection_page"]:
             if key in context.user_data:
                 print(f"  Удаляю из user_data: {key}")
                 context.user_data.pop(key, None)
@@ -778,104 +773,26 @@ async def cancel_assignment(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         return ConversationHandler.END
 
-async def handle_member_info_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def handle_member_info_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, member_username: str):
     """Обработка запроса информации о члене клуба"""
     query = update.callback_query
     await query.answer()
     
-    if query.data.startswith("member_info_"):
-        member_username = query.data.replace("member_info_", "")
-        member = firebase_service.get_member_by_telegram(member_username)
-        
-        if member:
-            # Функция для экранирования MarkdownV2
-            def escape_markdown_v2(text):
-                if not text:
-                    return ""
-                escape_chars = r'_*[]()~`>#+-=|{}.!'
-                result = []
-                for char in str(text):
-                    if char in escape_chars:
-                        result.append(f'\\{char}')
-                    else:
-                        result.append(char)
-                return ''.join(result)
-            
-            # Экранируем все поля
-            name_ru = escape_markdown_v2(member.full_name_ru)
-            name_en = escape_markdown_v2(member.full_name_en)
-            telegram = escape_markdown_v2(member.telegram)
-            group = escape_markdown_v2(member.group)
-            personality = escape_markdown_v2(member.personality_type)
-            birth_date = escape_markdown_v2(member.birth_date)
-            role = escape_markdown_v2(member.role)
-            
-            info_text = (
-                f"👤 *Информация о члене клуба\\:*\n\n"
-                f"*ФИО \\(рус\\)\\:* {name_ru}\n"
-                f"*ФИО \\(англ\\)\\:* {name_en}\n"
-                f"*Telegram\\:* @{telegram}\n"
-                f"*Группа\\:* {group}\n"
-                f"*Тип личности\\:* {personality}\n"
-                f"*Дата рождения\\:* {birth_date}\n"
-                f"*Роль\\:* {role}\n\n"
-                f"*Активные задания\\:*"
-            )
-            
-            tasks = firebase_service.get_member_tasks(member_username)
-            if tasks:
-                for task in tasks:
-                    status_text = {
-                        TaskStatus.NOT_STARTED: "Не начато",
-                        TaskStatus.IN_PROGRESS: "В процессе",
-                        TaskStatus.COMPLETED: "Завершено"
-                    }[task.status]
-                    
-                    task_title = escape_markdown_v2(task.title)
-                    info_text += f"\n• {task_title} \\({status_text}\\)"
-            else:
-                info_text += "\nНет активных заданий"
-            
-            try:
-                await query.edit_message_text(
-                    info_text, 
-                    parse_mode='MarkdownV2'
-                )
-            except Exception as e:
-                # Если все равно ошибка, отправляем без Markdown
-                print(f"❌ Markdown ошибка: {e}")
-                simple_text = (
-                    f"👤 Информация о члене клуба:\n\n"
-                    f"ФИО (рус): {member.full_name_ru}\n"
-                    f"ФИО (англ): {member.full_name_en}\n"
-                    f"Telegram: @{member.telegram}\n"
-                    f"Группа: {member.group}\n"
-                    f"Тип личности: {member.personality_type}\n"
-                    f"Дата рождения: {member.birth_date}\n"
-                    f"Роль: {member.role}\n\n"
-                    f"Активные задания:"
-                )
-                
-                if tasks:
-                    for task in tasks:
-                        status_text = {
-                            TaskStatus.NOT_STARTED: "Не начато",
-                            TaskStatus.IN_PROGRESS: "В процессе",
-                            TaskStatus.COMPLETED: "Завершено"
-                        }[task.status]
-                        simple_text += f"\n• {task.title} ({status_text})"
-                else:
-                    simple_text += "\nНет активных заданий"
-                
-                await query.edit_message_text(simple_text)
-        else:
-            await query.edit_message_text("Член клуба не найден.")
+    member = await async_firebase_service.get_member_by_telegram(member_username)
+    
+    if member:
+        tasks = await async_firebase_service.get_member_tasks(member_username)
+        await query.edit_message_text(render_member_card(member, tasks), parse_mode='HTML')
+    else:
+        await query.edit_message_text("Член клуба не найден.")
 
 assign_task_multi_conversation = ConversationHandler(
     entry_points=[MessageHandler(filters.Regex("^➕ Выдать задание$"), assign_task_multi_start)],
     states={
         MULTI_SELECT_MEMBERS: [
-            CallbackQueryHandler(handle_multi_user_toggle, pattern="^toggle_user_"),
+            CallbackQueryHandler(handle_multi_user_toggle, pattern=callbacks.matches(callbacks.TOGGLE_USER)),
+            CallbackQueryHandler(handle_multi_select_page, pattern=callbacks.matches(callbacks.SELECT_PAGE)),
+            CallbackQueryHandler(show_multi_selection, pattern="^show_selected$"),
             CallbackQueryHandler(confirm_multi_selection, pattern="^confirm_selection$"),
             CallbackQueryHandler(cancel_assignment, pattern="^cancel_multi_select$"),  # ← Исправлено!
         ],
@@ -888,3 +805,167 @@ assign_task_multi_conversation = ConversationHandler(
         CommandHandler("cancel", cancel_assignment)
     ],
 )
+
+
+# ============== РАССЫЛКА ==============
+
+def _broadcast_targets(members):
+    """Варианты получателей: все, администраторы, каждая роль и каждая группа"""
+    targets = [("👥 Все участники", "all"), ("👑 Администраторы", "admins")]
+    targets += [(f"🎭 Роль: {role}", f"role:{role}") for role in sorted({m.role for m in members if m.role})]
+    targets += [(f"🎓 Группа: {group}", f"group:{group}") for group in sorted({m.group for m in members if m.group})]
+    return targets
+
+
+def _broadcast_members(members, target: str):
+    if target == "all":
+        return list(members)
+    if target == "admins":
+        return [m for m in members if m.role in config.ADMIN_ROLES]
+    kind, _, value = target.partition(":")
+    if kind == "role":
+        return [m for m in members if m.role == value]
+    if kind == "group":
+        return [m for m in members if m.group == value]
+    return []
+
+
+async def broadcast_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Начать рассылку: /broadcast"""
+    if not context.user_data.get("is_admin"):
+        await update.message.reply_text("У вас нет прав администратора.")
+        return ConversationHandler.END
+    
+    members = await async_firebase_service.get_all_members()
+    targets = _broadcast_targets(members)
+    context.user_data["broadcast_targets"] = targets
+    context.user_data["broadcast_author"] = context.user_data.get("telegram_username", "")
+    
+    await update.message.reply_text(
+        "📣 *Рассылка*\n\nКому отправить сообщение?",
+        parse_mode='Markdown',
+        reply_markup=get_broadcast_targets_keyboard(targets)
+    )
+    return BROADCAST_TARGET
+
+
+async def broadcast_select_target(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Выбор получателей рассылки"""
+    query = update.callback_query
+    await query.answer()
+    
+    targets = context.user_data.get("broadcast_targets") or []
+    index = int(query.data.replace("bc_target_", ""))
+    if index >= len(targets):
+        await query.edit_message_text("❌ Список получателей устарел, начните заново: /broadcast")
+        return ConversationHandler.END
+    
+    label, target = targets[index]
+    members = _broadcast_members(await async_firebase_service.get_all_members(), target)
+    context.user_data["broadcast_target"] = (label, target)
+    
+    await query.edit_message_text(
+        f"🎯 Получатели: {label} ({len(members)})\n\n"
+        "Введите текст рассылки (или /cancel для отмены):"
+    )
+    return BROADCAST_TEXT
+
+
+async def broadcast_get_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Текст рассылки и подтверждение"""
+    context.user_data["broadcast_text"] = update.message.text
+    label, _ = context.user_data["broadcast_target"]
+    
+    await update.message.reply_text(
+        f"🎯 Получатели: {label}\n\n"
+        f"{update.message.text}\n\n"
+        "Отправить?",
+        reply_markup=get_broadcast_confirm_keyboard()
+    )
+    return BROADCAST_CONFIRM
+
+
+async def broadcast_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Запустить рассылку в фоне - админ может дальше пользоваться ботом"""
+    query = update.callback_query
+    await query.answer()
+    
+    from jobs import job_runtime
+    label, target = context.user_data.pop("broadcast_target")
+    text = context.user_data.pop("broadcast_text")
+    author = context.user_data.pop("broadcast_author", "")
+    context.user_data.pop("broadcast_targets", None)
+    
+    members = _broadcast_members(await async_firebase_service.get_all_members(), target)
+    job = job_runtime.submit(
+        "broadcasts", _run_broadcast, context.bot, query.message.chat_id, label, members,
+        f"📣 Объявление от @{author}\n\n{text}",
+        name=f"broadcast {target}"
+    )
+    
+    if job:
+        await query.edit_message_text(f"🚀 Рассылка запущена: {label} ({len(members)})")
+    else:
+        await query.edit_message_text("❌ Слишком много рассылок в очереди, попробуйте позже.")
+    return ConversationHandler.END
+
+
+async def _run_broadcast(bot, chat_id: int, label: str, members, text: str):
+    """Фоновая рассылка с живым прогрессом в одном сообщении"""
+    from notifications import notification_service
+    
+    recipients = [(m.telegram, m.chat_id) for m in members if m.chat_id > 0]
+    without_chat = {m.telegram: "нет chat_id" for m in members if m.chat_id <= 0}
+    total = len(members)
+    
+    def progress_text(report, finished: bool) -> str:
+        return render_broadcast_progress(
+            label, total, report.success_count, len(report.failed),
+            len(report.skipped) + len(without_chat), finished
+        )
+    
+    progress = await bot.send_message(chat_id, progress_text(DeliveryReport(), False), parse_mode='HTML')
+    last_edit = time.monotonic()
+    
+    async def on_progress(report, done: int):
+        nonlocal last_edit
+        if time.monotonic() - last_edit < BROADCAST_PROGRESS_INTERVAL:
+            return
+        last_edit = time.monotonic()
+        try:
+            await progress.edit_text(progress_text(report, False), parse_mode='HTML')
+        except TelegramError as e:
+            print(f"⚠️  Не удалось обновить прогресс рассылки: {e}")
+    
+    report = await notification_service.broadcast(
+        recipients, text, on_progress=on_progress, chunk_size=config.BROADCAST_CHUNK_SIZE
+    )
+    await progress.edit_text(progress_text(report, True), parse_mode='HTML')
+    print(f"📣 Рассылка «{label}»: {report.summary()}, без chat_id: {len(without_chat)}")
+
+
+async def broadcast_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Отмена рассылки"""
+    for key in ("broadcast_targets", "broadcast_target", "broadcast_text", "broadcast_author"):
+        context.user_data.pop(key, None)
+    
+    if update.callback_query:
+        await update.callback_query.answer()
+        await update.callback_query.edit_message_text("❌ Рассылка отменена.")
+    else:
+        await update.message.reply_text("❌ Рассылка отменена.")
+    return ConversationHandler.END
+
+
+broadcast_conversation = ConversationHandler(
+    entry_points=[CommandHandler("broadcast", broadcast_start)],
+    states={
+        BROADCAST_TARGET: [CallbackQueryHandler(broadcast_select_target, pattern="^bc_target_")],
+        BROADCAST_TEXT: [MessageHandler(filters.TEXT & ~filters.COMMAND, broadcast_get_text)],
+        BROADCAST_CONFIRM: [CallbackQueryHandler(broadcast_confirm, pattern="^bc_confirm$")],
+    },
+    fallbacks=[
+        CallbackQueryHandler(broadcast_cancel, pattern="^bc_cancel$"),
+        CommandHandler("cancel", broadcast_cancel)
+    ],
+)
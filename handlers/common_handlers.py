@@ -1,12 +1,65 @@
 # handlers/common_handlers.py
 from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler, MessageHandler, filters
-from firebase_service import firebase_service
+from firebase_service import async_firebase_service
+from cache import member_directory
+from identity import identities
+from unreachable import unreachable_chats
 from keyboards import get_main_menu_keyboard
 from config import config
 import logging
 
-firebase_service = firebase_service
+def _apply_identity(context: ContextTypes.DEFAULT_TYPE, identity):
+    """Заполнить user_data по сохраненной записи о пользователе"""
+    member = member_directory.get(identity["member_id"]) if identity["member_id"] else None
+    # Справочник загружен, а участника в нем нет - его удалили, сохраненной роли не доверяем
+    is_member = bool(identity["member_id"]) and (member is not None or not member_directory.is_fresh)
+    
+    if not is_member:
+        # Удаленный участник не должен сохранить права из прошлого /start
+        for key in ("telegram_username", "is_admin", "member"):
+            context.user_data.pop(key, None)
+        return
+    
+    # Если справочник уже в памяти, роль берем из него - она свежее сохраненной
+    role = member.role if member is not None else identity["role"]
+    context.user_data["telegram_username"] = identity["telegram"]
+    context.user_data["is_admin"] = role in config.ADMIN_ROLES
+    if member is not None:
+        context.user_data["member"] = member
+
+
+async def identify_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Промежуточный обработчик (группа -1): определяет участника по Telegram user id
+    до остальных обработчиков, так что /start после перезапуска не нужен"""
+    user = update.effective_user
+    if user is None or context.user_data is None:
+        return
+    
+    identity = identities.get(user.id)
+    # Сменил username в Telegram - запись устарела
+    if identity is not None and user.username and identity["telegram"].lower() != user.username.lower():
+        identity = None
+    # Не был участником, но уже появился в справочнике (проверка в памяти)
+    if (identity is not None and not identity["member_id"] and user.username
+            and member_directory.is_fresh and member_directory.get_by_telegram(user.username)):
+        identity = None
+    
+    if identity is None:
+        if not user.username:
+            # Без username участника не определить - как и для не участников, прав не оставляем
+            for key in ("telegram_username", "is_admin", "member"):
+                context.user_data.pop(key, None)
+            return
+        # Справочник в памяти; к Firebase обращаемся, только если он еще не загружен
+        member = member_directory.get_by_telegram(user.username) if member_directory.is_fresh else None
+        if member is None:
+            member = await async_firebase_service.get_member_by_telegram(user.username)
+        identity = identities.remember(user.id, user.username, member)
+        print(f"🪪 @{user.username} ({user.id}): {member.role if member else 'не участник клуба'}")
+    
+    _apply_identity(context, identity)
+
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """ЕДИНСТВЕННАЯ функция /start"""
@@ -24,7 +77,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     # Ищем пользователя
-    member = firebase_service.get_member_by_telegram(username)
+    member = await async_firebase_service.get_member_by_telegram(username)
     
     if member:
         print(f"✅ Найден: {member.full_name_ru}")
@@ -32,14 +85,14 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         print(f"💾 Текущий chat_id: {member.chat_id}")
         
         # СОХРАНЯЕМ CHAT_ID В FIREBASE
-        try:
-            print(f"💾 Сохраняю chat_id {chat_id}...")
-            firebase_service.db.child("members").child(member.id).update({"chat_id": chat_id})
-            print(f"✅ Chat_id сохранен в Firebase!")
-        except Exception as e:
-            print(f"❌ Ошибка сохранения: {e}")
+        if not await async_firebase_service.update_member_chat_id(member.id, chat_id):
+            print(f"❌ Ошибка сохранения chat_id")
+        
+        # Участник снова пишет боту - чат больше не считается недоступным
+        unreachable_chats.clear(chat_id)
         
-        # Сохраняем данные в context
+        # Сохраняем данные в context и запоминаем пользователя на случай перезапуска
+        identities.remember(update.effective_user.id, username, member)
         is_admin = member.role in config.ADMIN_ROLES
         context.user_data["is_admin"] = is_admin
         context.user_data["member"] = member
@@ -56,6 +109,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
     else:
         print(f"❌ Пользователь не найден в базе")
+        identities.remember(update.effective_user.id, username, None)
         await update.message.reply_text(
             f"Привет, {update.effective_user.first_name}!\n"
             f"Твой username: @{username}\n\n"
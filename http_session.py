@@ -0,0 +1,84 @@
+# http_session.py
+import random
+from typing import List, Dict, Any
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Запросы, которые безопасно повторять (POST/push может создать дубликат)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "PATCH", "DELETE", "OPTIONS"})
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class JitterRetry(Retry):
+    """Retry с экспоненциальной задержкой и случайным разбросом (full jitter)"""
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return 0
+        return random.uniform(0, backoff)
+
+
+class PooledSession(requests.Session):
+    """requests.Session с таймаутом по умолчанию для каждого запроса"""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+def create_session(
+    pool_size: int = 10,
+    connect_timeout: float = 5,
+    read_timeout: float = 15,
+    max_retries: int = 3,
+    backoff_factor: float = 0.3
+) -> PooledSession:
+    """Создать общую keep-alive сессию с пулом соединений и повторами"""
+    session = PooledSession(timeout=(connect_timeout, read_timeout))
+
+    retry = JitterRetry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=IDEMPOTENT_METHODS,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def session_stats(session: requests.Session) -> List[Dict[str, Any]]:
+    """Статистика пулов по хостам: сколько соединений открыто и сколько запросов прошло через них"""
+    stats = []
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    for adapter in adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats.append({
+                "scheme": pool.scheme,
+                "host": pool.host,
+                "port": pool.port,
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "reused": max(0, pool.num_requests - pool.num_connections),
+                "idle": pool.pool.qsize() if pool.pool is not None else 0,
+            })
+    return stats
@@ -0,0 +1,70 @@
+# identity.py
+import threading
+import time
+from typing import Optional, Dict, Any
+from config import config
+from models import Member
+from storage import connect
+
+
+class IdentityCache:
+    """Соответствие Telegram user id -> участник клуба (username, роль).
+
+    Хранится в локальной базе, поэтому переживает перезапуск бота; читается
+    из копии в памяти. Записи старше ttl считаются устаревшими и
+    перепроверяются по справочнику участников. Пустой member_id - пользователь
+    не найден в базе (чтобы не искать его на каждом сообщении).
+    """
+
+    def __init__(self, path: str = None, ttl: float = 0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.conn = connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS identities (
+                user_id INTEGER PRIMARY KEY,
+                member_id TEXT NOT NULL DEFAULT '',
+                telegram TEXT NOT NULL DEFAULT '',
+                role TEXT NOT NULL DEFAULT '',
+                resolved_at REAL NOT NULL
+            )
+        """)
+        self._identities: Dict[int, Dict[str, Any]] = {
+            row["user_id"]: dict(row) for row in self.conn.execute("SELECT * FROM identities")
+        }
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Актуальная запись о пользователе (None - нет или истек TTL)"""
+        identity = self._identities.get(user_id)
+        if identity is None:
+            return None
+        if self.ttl and time.time() - identity["resolved_at"] >= self.ttl:
+            return None
+        return identity
+
+    def remember(self, user_id: int, telegram: str, member: Optional[Member]) -> Dict[str, Any]:
+        """Запомнить, кем является пользователь (member=None - не участник клуба)"""
+        identity = {
+            "user_id": user_id,
+            "member_id": (member.id or "") if member else "",
+            "telegram": member.telegram if member else (telegram or ""),
+            "role": member.role if member else "",
+            "resolved_at": time.time()
+        }
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO identities (user_id, member_id, telegram, role, resolved_at) "
+                "VALUES (:user_id, :member_id, :telegram, :role, :resolved_at)",
+                identity
+            )
+            self._identities[user_id] = identity
+        return identity
+
+    def forget(self, user_id: int):
+        with self._lock:
+            self.conn.execute("DELETE FROM identities WHERE user_id = ?", (user_id,))
+            self._identities.pop(user_id, None)
+
+
+# Глобальный экземпляр
+identities = IdentityCache(config.LOCAL_DB_PATH, ttl=config.IDENTITY_TTL)
@@ -0,0 +1,217 @@
+# jobs.py
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import Optional, List, Dict, Any, Callable, Coroutine, Tuple
+from config import config
+
+
+class Job:
+    """Одна фоновая задача и ее результат"""
+
+    def __init__(self, job_id: int, kind: str, name: str, func: Callable[..., Coroutine], args: tuple, kwargs: dict):
+        self.id = job_id
+        self.kind = kind
+        self.name = name or getattr(func, "__name__", "job")
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.status = "queued"  # queued / running / done / failed / cancelled
+        self.error: Optional[str] = None
+        self.created_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self.cancel_requested = False
+
+    @property
+    def wait_time(self) -> Optional[float]:
+        return self.started_at - self.created_at if self.started_at is not None else None
+
+    @property
+    def run_time(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+class JobPool:
+    """Именованный пул: очередь ограниченного размера и фиксированное число воркеров"""
+
+    def __init__(self, kind: str, workers: int, queue_size: int):
+        self.kind = kind
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.stats = {"submitted": 0, "done": 0, "failed": 0, "cancelled": 0, "rejected": 0,
+                      "run_time": 0.0, "max_run_time": 0.0, "max_wait_time": 0.0}
+        self._workers: List[asyncio.Task] = []
+
+    def start(self):
+        self._workers = [
+            asyncio.create_task(self._work(), name=f"jobs-{self.kind}-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def _work(self):
+        while True:
+            job: Job = await self.queue.get()
+            try:
+                if job.status == "cancelled":
+                    continue
+                job.status = "running"
+                job.started_at = time.monotonic()
+                job.task = asyncio.current_task()
+                try:
+                    await job.func(*job.args, **job.kwargs)
+                    job.status = "done"
+                except asyncio.CancelledError:
+                    job.status = "cancelled"
+                    if not job.cancel_requested:
+                        raise
+                    # Отменили только эту задачу - воркер продолжает работу
+                    asyncio.current_task().uncancel()
+                except Exception as e:
+                    job.status = "failed"
+                    job.error = f"{type(e).__name__}: {e}"
+                    print(f"❌ Фоновая задача {self.kind}/{job.name} #{job.id} упала: {job.error}")
+                finally:
+                    job.task = None
+                    job.finished_at = time.monotonic()
+                    self._record(job)
+            finally:
+                self.queue.task_done()
+
+    def _record(self, job: Job):
+        self.stats[job.status] = self.stats.get(job.status, 0) + 1
+        # Прерванные задачи не попадают в среднее время (оно считается по done + failed)
+        if job.run_time is not None and job.status in ("done", "failed"):
+            self.stats["run_time"] += job.run_time
+            self.stats["max_run_time"] = max(self.stats["max_run_time"], job.run_time)
+        if job.wait_time is not None:
+            self.stats["max_wait_time"] = max(self.stats["max_wait_time"], job.wait_time)
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+class JobRuntime:
+    """Фоновые задачи с учетом: пулы по типам, ограничение очереди, статистика и мягкая остановка.
+
+    Пулы создаются в start() внутри работающего цикла событий (post_init приложения).
+    """
+
+    def __init__(self, pools: Dict[str, Tuple[int, int]], history_size: int = 200):
+        # pools: тип задачи -> (число воркеров, размер очереди)
+        self.pool_config = pools
+        self.pools: Dict[str, JobPool] = {}
+        self.history: deque = deque(maxlen=history_size)
+        self._jobs: Dict[int, Job] = {}
+        self._ids = itertools.count(1)
+        self._accepting = False
+
+    def start(self):
+        if self._accepting:
+            return
+        for kind, (workers, queue_size) in self.pool_config.items():
+            pool = JobPool(kind, workers, queue_size)
+            pool.start()
+            self.pools[kind] = pool
+        self._accepting = True
+        print(f"⚙️  Фоновые задачи: {', '.join(f'{kind} x{pool.workers}' for kind, pool in self.pools.items())}")
+
+    def submit(self, kind: str, func: Callable[..., Coroutine], *args, name: str = "", **kwargs) -> Optional[Job]:
+        """Поставить задачу в очередь пула. None - если пул переполнен или рантайм остановлен"""
+        pool = self.pools.get(kind)
+        if not self._accepting or pool is None:
+            print(f"⚠️  Фоновая задача {kind}/{name or func.__name__} отклонена: пул не запущен")
+            return None
+
+        job = Job(next(self._ids), kind, name, func, args, kwargs)
+        try:
+            pool.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            pool.stats["rejected"] += 1
+            print(f"⚠️  Очередь {kind} переполнена ({pool.queue.maxsize}) - задача {job.name} отклонена")
+            return None
+
+        self._track(pool, job)
+        return job
+
+    def _track(self, pool: JobPool, job: Job):
+        pool.stats["submitted"] += 1
+        # В словаре держим только незавершенные задачи
+        for finished in [job_id for job_id, item in self._jobs.items() if item.finished_at is not None]:
+            del self._jobs[finished]
+        self._jobs[job.id] = job
+        self.history.append(job)
+
+    async def submit_wait(self, kind: str, func: Callable[..., Coroutine], *args, name: str = "", **kwargs) -> Optional[Job]:
+        """Как submit, но при переполненной очереди ждет места (обратное давление на вызывающего)"""
+        pool = self.pools.get(kind)
+        if not self._accepting or pool is None:
+            return None
+        job = Job(next(self._ids), kind, name, func, args, kwargs)
+        await pool.queue.put(job)
+        self._track(pool, job)
+        return job
+
+    def cancel(self, job_id: int) -> bool:
+        """Отменить задачу: из очереди она не запустится, выполняющаяся будет прервана"""
+        job = self._jobs.get(job_id)
+        if job is None or job.finished_at is not None:
+            return False
+        if job.status == "queued":
+            job.status = "cancelled"
+            job.finished_at = time.monotonic()
+            self.pools[job.kind]._record(job)
+            return True
+        if job.task is not None:
+            job.cancel_requested = True
+            job.task.cancel()
+            return True
+        return False
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for kind, pool in self.pools.items():
+            stats = dict(pool.stats)
+            finished = stats["done"] + stats["failed"]
+            stats["avg_run_time"] = stats["run_time"] / finished if finished else 0.0
+            stats["queued"] = pool.queue.qsize()
+            result[kind] = stats
+        return result
+
+    async def shutdown(self, timeout: float = 30):
+        """Перестать принимать задачи, дождаться очередей (не дольше timeout) и остановить воркеры"""
+        if not self._accepting:
+            return
+        self._accepting = False
+        pending = sum(pool.queue.qsize() for pool in self.pools.values())
+        if pending:
+            print(f"⏳ Дожидаемся фоновых задач: {pending}")
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(pool.queue.join() for pool in self.pools.values())),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            print(f"⚠️  Фоновые задачи не завершились за {timeout} с - прерываем")
+        for pool in self.pools.values():
+            await pool.stop()
+        for kind, stats in self.stats().items():
+            print(f"📊 Задачи {kind}: выполнено {stats['done']}, ошибок {stats['failed']}, "
+                  f"отклонено {stats['rejected']}, отменено {stats['cancelled']}, "
+                  f"в среднем {stats['avg_run_time'] * 1000:.0f} мс, максимум {stats['max_run_time'] * 1000:.0f} мс")
+        self.pools = {}
+
+
+# Глобальный экземпляр (запускается в post_init приложения)
+job_runtime = JobRuntime({
+    "notifications": (config.JOB_NOTIFY_WORKERS, config.JOB_QUEUE_SIZE),
+    # Рассылки идут по одной, чтобы не делить лимит Telegram между собой
+    "broadcasts": (1, 10),
+})
@@ -1,7 +1,9 @@
 # keyboards.py - ОБНОВЛЕННАЯ ВЕРСИЯ
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup
+import callbacks
 from config import config
 from models import TaskStatus
+from rendering import user_status, STATUS_EMOJI, STATUS_NAMES
 
 
 def get_main_menu_keyboard(is_admin: bool):
@@ -25,24 +27,24 @@ def get_task_status_keyboard(task_id: str):
     keyboard = [
         [
             InlineKeyboardButton("🟡 Не начато", 
-                callback_data=f"set_status|{task_id}|NOT"),
+                callback_data=callbacks.encode(callbacks.SET_STATUS, task_id, "n")),
             InlineKeyboardButton("🟠 В процессе", 
-                callback_data=f"set_status|{task_id}|IN"),
+                callback_data=callbacks.encode(callbacks.SET_STATUS, task_id, "i")),
         ],
         [
             InlineKeyboardButton("🟢 Завершено", 
-                callback_data=f"set_status|{task_id}|COMPLETED")
+                callback_data=callbacks.encode(callbacks.SET_STATUS, task_id, "c"))
         ]
     ]
     return InlineKeyboardMarkup(keyboard)
 
 
-def get_members_keyboard(members, action: str = "info"):
-    """Клавиатура со списком членов клуба"""
+def get_members_keyboard(members, op: str = callbacks.MEMBER_INFO):
+    """Клавиатура со списком членов клуба; op - код операции кнопки (callbacks)"""
     keyboard = []
     for member in members:
         button_text = f"{member.full_name_ru} ({member.telegram_username})"
-        callback_data = f"{action}_{member.telegram_username}"
+        callback_data = callbacks.encode(op, member.telegram_username)
         keyboard.append([InlineKeyboardButton(button_text, callback_data=callback_data)])
     
     return InlineKeyboardMarkup(keyboard)
@@ -58,23 +60,31 @@ def get_task_selection_keyboard(tasks, action: str = "view"):
     
     return InlineKeyboardMarkup(keyboard)
 
-def get_multi_member_selection_keyboard(members, selected_users=None):
-    """Клавиатура для выбора нескольких участников"""
+def get_multi_member_selection_keyboard(members, selected_users=None, page: int = 0, page_size: int = None):
+    """Клавиатура для выбора нескольких участников (постранично).
+    members - снимок [(username, ФИО)], selected_users - множество выбранных username"""
     if selected_users is None:
-        selected_users = []
+        selected_users = set()
+    page_size = page_size or config.SELECTION_PAGE_SIZE
     
     keyboard = []
     
-    for member in members:
+    for username, full_name in members[page * page_size:(page + 1) * page_size]:
         # Добавляем галочку если пользователь выбран
-        if not member.telegram_username:
-            continue
-            
-        prefix = "✅ " if member.telegram_username in selected_users else "☐ "
-        button_text = f"{prefix}{member.full_name_ru} (@{member.telegram_username})"
-        callback_data = f"toggle_user_{member.telegram_username}"
-        
-        keyboard.append([InlineKeyboardButton(button_text, callback_data=callback_data)])
+        prefix = "✅ " if username in selected_users else "☐ "
+        button_text = f"{prefix}{full_name} (@{username})"
+        keyboard.append([InlineKeyboardButton(button_text, callback_data=callbacks.encode(callbacks.TOGGLE_USER, username))])
+    
+    # Переход между страницами
+    pages = (len(members) + page_size - 1) // page_size
+    if pages > 1:
+        navigation = []
+        if page > 0:
+            navigation.append(InlineKeyboardButton("⬅️", callback_data=callbacks.encode(callbacks.SELECT_PAGE, page - 1)))
+        navigation.append(InlineKeyboardButton(f"{page + 1}/{pages}", callback_data=callbacks.encode(callbacks.SELECT_PAGE, page)))
+        if page < pages - 1:
+            navigation.append(InlineKeyboardButton("➡️", callback_data=callbacks.encode(callbacks.SELECT_PAGE, page + 1)))
+        keyboard.append(navigation)
     
     # Кнопки действий
     action_row = []
@@ -97,7 +107,64 @@ def get_multi_member_selection_keyboard(members, selected_users=None):
     
     return InlineKeyboardMarkup(keyboard)
 
+def get_member_tasks_keyboard(tasks, username: str, page: int, total: int, page_size: int):
+    """Страница списка «Мои задания» с кнопками перехода между страницами"""
+    keyboard = []
+    for task in tasks:
+        status_emoji = STATUS_EMOJI[user_status(task, username).value]
+        task_title = task.title[:30] + "..." if len(task.title) > 30 else task.title
+        keyboard.append([InlineKeyboardButton(f"{status_emoji} {task_title}", callback_data=callbacks.encode(callbacks.VIEW_TASK, task.id))])
+
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton("⬅️ Назад", callback_data=callbacks.encode(callbacks.TASKS_PAGE, page - 1)))
+    if (page + 1) * page_size < total:
+        navigation.append(InlineKeyboardButton("Вперед ➡️", callback_data=callbacks.encode(callbacks.TASKS_PAGE, page + 1)))
+    if navigation:
+        keyboard.append(navigation)
+
+    keyboard.append([InlineKeyboardButton("🔄 Обновить список", callback_data=callbacks.encode(callbacks.REFRESH_TASKS))])
+    return InlineKeyboardMarkup(keyboard)
+
+def get_status_summary_keyboard(summary):
+    """Кнопки перехода от сводки к списку назначений в статусе"""
+    keyboard = [
+        [InlineKeyboardButton(f"{STATUS_EMOJI[status]} {name} ({summary.get(status, 0)})", callback_data=callbacks.encode(callbacks.STATUS_REPORT, callbacks.STATUS_CODES[status], 0))]
+        for status, name in STATUS_NAMES.items()
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+
+def get_status_page_keyboard(status: str, page: int, total: int, page_size: int):
+    """Навигация по страницам назначений в статусе"""
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton("⬅️ Назад", callback_data=callbacks.encode(callbacks.STATUS_REPORT, callbacks.STATUS_CODES[status], page - 1)))
+    if (page + 1) * page_size < total:
+        navigation.append(InlineKeyboardButton("Вперед ➡️", callback_data=callbacks.encode(callbacks.STATUS_REPORT, callbacks.STATUS_CODES[status], page + 1)))
+    keyboard = [navigation] if navigation else []
+    keyboard.append([InlineKeyboardButton("📊 К сводке", callback_data=callbacks.encode(callbacks.STATUS_REPORT))])
+    return InlineKeyboardMarkup(keyboard)
+
 def get_cancel_keyboard():
     """Клавиатура для отмены действия"""
     keyboard = [["❌ Отмена"]]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
\ No newline at end of file
+    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
+
+
+def get_broadcast_targets_keyboard(targets):
+    """Выбор получателей рассылки: targets - список (название, ключ)"""
+    keyboard = [
+        [InlineKeyboardButton(label, callback_data=f"bc_target_{i}")]
+        for i, (label, _) in enumerate(targets)
+    ]
+    keyboard.append([InlineKeyboardButton("❌ Отмена", callback_data="bc_cancel")])
+    return InlineKeyboardMarkup(keyboard)
+
+def get_broadcast_confirm_keyboard():
+    """Подтверждение рассылки"""
+    keyboard = [[
+        InlineKeyboardButton("✅ Отправить", callback_data="bc_confirm"),
+        InlineKeyboardButton("❌ Отмена", callback_data="bc_cancel")
+    ]]
+    return InlineKeyboardMarkup(keyboard)
@@ -1,7 +1,7 @@
 # models.py
 from typing import Optional, List, Dict, Any, Union
 from enum import Enum
-from datetime import date
+from datetime import date, datetime
 from pydantic import BaseModel, Field, validator, ConfigDict
 import re
 
@@ -44,6 +44,11 @@ class TaskStatus(str, Enum):
     IN_PROGRESS = "in_progress"
     COMPLETED = "completed"
 
+class NotifyMode(str, Enum):
+    INSTANT = "instant"  # каждое изменение отдельным сообщением
+    BATCHED = "batched"  # сводка за окно DIGEST_WINDOW_SECONDS
+    DAILY = "daily"      # одна сводка в день
+
 class Member(BaseModel):
     """Модель участника клуба"""
     id: Optional[str] = None
@@ -55,6 +60,7 @@ class Member(BaseModel):
     personality_type: str = Field(default="")
     birth_date: str = Field(default="")
     role: str = Field(default="Member")
+    notify_mode: str = Field(default="")  # NotifyMode; пусто - значение по умолчанию из конфига
     
     @validator('telegram', pre=True)
     def clean_telegram(cls, v):
@@ -74,7 +80,7 @@ class Member(BaseModel):
         except (ValueError, TypeError):
             return 0
     
-    @validator('full_name_ru', 'full_name_en', 'group', 'personality_type', 'role', pre=True)
+    @validator('full_name_ru', 'full_name_en', 'group', 'personality_type', 'role', 'notify_mode', pre=True)
     def clean_string_fields(cls, v):
         if v is None:
             return ""
@@ -259,6 +265,31 @@ class SingleUserTask(BaseModel):
     model_config = ConfigDict(use_enum_values=True)
 
 
+class TaskComment(BaseModel):
+    """Комментарий к заданию (task_comments/<task_id>/<push_id>)"""
+    id: Optional[str] = None
+    author: str = ""
+    text: str = ""
+    created_at: str = ""
+
+
+class DeliveryReport(BaseModel):
+    """Итог рассылки уведомлений по получателям"""
+    total: int = 0
+    sent: List[str] = Field(default_factory=list)
+    queued: List[str] = Field(default_factory=list)  # поставлено в очередь отправки
+    failed: Dict[str, str] = Field(default_factory=dict)  # получатель -> ошибка
+    skipped: Dict[str, str] = Field(default_factory=dict)  # получатель -> причина
+    
+    @property
+    def success_count(self) -> int:
+        return len(self.sent)
+    
+    def summary(self) -> str:
+        return (f"отправлено {self.success_count}/{self.total}, в очереди {len(self.queued)}, "
+                f"ошибок {len(self.failed)}, пропущено {len(self.skipped)}")
+
+
 class TaskAssignment(BaseModel):
     """Модель для назначения задания (старый формат)"""
     admin_username: str
@@ -384,4 +415,81 @@ def create_task_for_multiple_users(
         created_at=created_at,
         deadline=deadline,
         status=status_dict
-    )
\ No newline at end of file
+    )
+
+def member_from_data(member_id: str, member_data: Dict[str, Any]) -> Optional[Member]:
+    """Создать Member из сырых данных Firebase (с упрощенной версией при ошибке)"""
+    if not isinstance(member_data, dict):
+        return None
+    
+    member_data_with_id = member_data.copy()
+    member_data_with_id["id"] = member_id
+    
+    try:
+        return Member(**member_data_with_id)
+    except Exception as e:
+        print(f"⚠️  Ошибка парсинга member {member_id}: {e}")
+        print(f"📊 Проблемные данные: {member_data}")
+        try:
+            return Member(
+                id=member_id,
+                telegram=member_data.get("telegram", ""),
+                full_name_ru=member_data.get("full_name_ru", "Неизвестно"),
+                role=member_data.get("role", "Member"),
+                chat_id=member_data.get("chat_id", 0)
+            )
+        except Exception:
+            return None
+
+
+def normalize_task_data(task_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Привести сырые данные задания из Firebase к новому формату (копия)"""
+    task_data = dict(task_data)
+    
+    # Обработка старых форматов assigned_to
+    if isinstance(task_data.get("assigned_to"), str):
+        task_data["assigned_to"] = [task_data["assigned_to"]]
+    
+    # Обработка статуса: один статус -> словарь статусов
+    if not isinstance(task_data.get("status"), dict):
+        if isinstance(task_data.get("assigned_to"), list) and task_data["assigned_to"]:
+            status_dict = {}
+            for username in task_data["assigned_to"]:
+                status_dict[username] = task_data.get("status", TaskStatus.NOT_STARTED.value)
+            task_data["status"] = status_dict
+    else:
+        task_data["status"] = dict(task_data["status"])
+    
+    return task_data
+
+
+def task_from_data(task_id: str, task_data: Dict[str, Any]) -> Optional[Task]:
+    """Создать Task из данных Firebase"""
+    if not isinstance(task_data, dict):
+        return None
+    
+    task_data = normalize_task_data(task_data)
+    task_data["id"] = task_id
+    try:
+        return Task(**task_data)
+    except Exception as e:
+        print(f"⚠️  Ошибка парсинга задачи {task_id}: {e}")
+        print(f"📊 Проблемные данные: {task_data}")
+        return None
+
+
+
+def parse_deadline(deadline: Optional[str]) -> Optional[date]:
+    """Разобрать дедлайн в формате ДД.ММ.ГГГГ"""
+    if not deadline:
+        return None
+    try:
+        return datetime.strptime(str(deadline).strip(), "%d.%m.%Y").date()
+    except ValueError:
+        return None
+
+
+def deadline_key(deadline: Optional[str]) -> Optional[str]:
+    """Сортируемый ключ дедлайна (ГГГГ-ММ-ДД) для запросов orderByChild"""
+    parsed = parse_deadline(deadline)
+    return parsed.isoformat() if parsed else None
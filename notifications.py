@@ -1,142 +1,387 @@
 # notifications.py
-from telegram import Bot
-from telegram.error import TelegramError
+from telegram.error import TelegramError, BadRequest, Forbidden, RetryAfter
+from telegram.ext import ExtBot, BaseRateLimiter
+from typing import List, Optional, Tuple, Dict, Any, Callable, Awaitable
 from config import config
+from models import DeliveryReport, NotifyMode, parse_deadline
+from outbox import Outbox
+from digest import DigestBuffer
+from rate_limiter import rate_limiter, BULK
+from unreachable import UnreachableRegistry, unreachable_chats
+from rendering import render_digest, render_status_update, render_new_task, render_deadline_reminder
+from datetime import datetime, timedelta
 import asyncio
-import re
+import random
+import time
+
+# Как часто чистить очередь от старых недоставленных сообщений (секунды)
+OUTBOX_PURGE_INTERVAL = 3600
+
+def _is_unreachable_error(error: Exception) -> bool:
+    """Ошибки, после которых писать в этот чат бесполезно"""
+    if isinstance(error, Forbidden):
+        return True
+    return isinstance(error, BadRequest) and "chat not found" in str(error).lower()
 
-def escape_markdown(text: str) -> str:
-    """Экранирует специальные символы MarkdownV2"""
-    if not text:
-        return ""
-    
-    # Экранируем только символы, которые могут сломать разметку
-    escape_chars = r'_*[]()~`>#+-=|{}.!'
-    escaped_text = ""
-    for char in str(text):
-        if char in escape_chars:
-            escaped_text += '\\' + char
-        else:
-            escaped_text += char
-    return escaped_text
 
 class NotificationService:
-    def __init__(self, bot_token: str):
-        self.bot = Bot(token=bot_token)
+    def __init__(self, bot_token: str, max_concurrency: int = 10, outbox: Optional[Outbox] = None,
+                 digest: Optional[DigestBuffer] = None, default_mode: str = NotifyMode.BATCHED.value,
+                 rate_limiter: Optional[BaseRateLimiter] = None, unreachable: Optional[UnreachableRegistry] = None):
+        self.bot = ExtBot(token=bot_token, rate_limiter=rate_limiter)
+        # Уведомления - массовый трафик, пропускаем вперед ответы пользователям
+        self._send_kwargs = {"rate_limit_args": BULK} if rate_limiter else {}
+        self.max_concurrency = max_concurrency
+        self.outbox = outbox
+        self.digest = digest
+        self.unreachable = unreachable
+        self.default_mode = self._normalize_mode(default_mode, NotifyMode.INSTANT.value)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker_task: Optional[asyncio.Task] = None
+        self._purged_at = 0.0
+
+    async def _deliver(self, chat_id: int, text: str, parse_mode: Optional[str] = None):
+        """Отправить одно сообщение. Ошибки Telegram пробрасываются"""
+        await self.bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode, **self._send_kwargs)
+
+    def _remember_failure(self, recipient: str, chat_id: int, error: Exception):
+        """Пометить чат недоступным, если ошибка это означает"""
+        if self.unreachable is not None and _is_unreachable_error(error):
+            self.unreachable.mark(chat_id, recipient, str(error))
+
+    def _split_reachable(self, recipients: List[Tuple[str, int]]) -> Tuple[List[Tuple[str, int]], Dict[str, str]]:
+        if self.unreachable is None:
+            return recipients, {}
+        return self.unreachable.split(recipients)
+
+    async def _fan_out(self, recipients: List[Tuple[str, int]], text: str,
+                       parse_mode: Optional[str] = None) -> DeliveryReport:
+        """Отправить сообщение всем получателям параллельно (не больше max_concurrency одновременно)"""
+        report = DeliveryReport(total=len(recipients))
+        semaphore = asyncio.Semaphore(self.max_concurrency)
 
-    # Использование в вашем коде:
-    async def notify_admins_task_update(self, firebase_service, task, old_status, new_status):
-        """Уведомить администраторов об изменении статуса задания"""
+        async def deliver(username: str, chat_id: int):
+            async with semaphore:
+                try:
+                    await self._deliver(chat_id, text, parse_mode)
+                except TelegramError as e:
+                    report.failed[username] = str(e)
+                    self._remember_failure(username, chat_id, e)
+                except Exception as e:
+                    report.failed[username] = f"{type(e).__name__}: {e}"
+                else:
+                    report.sent.append(username)
+
+        await asyncio.gather(*(deliver(username, chat_id) for username, chat_id in recipients))
+
+        for username, error in report.failed.items():
+            print(f"❌ Ошибка отправки @{username}: {error}")
+        return report
+
+    async def _dispatch(self, recipients: List[Tuple[str, int]], text: str, parse_mode: Optional[str] = None,
+                        kind: str = "") -> DeliveryReport:
+        """Поставить сообщение в постоянную очередь (или отправить сразу, если очереди нет)"""
+        # Недоступные чаты не тратят ни места в очереди, ни запросов к API
+        recipients, skipped = self._split_reachable(recipients)
+        if self.outbox is None:
+            report = await self._fan_out(recipients, text, parse_mode)
+        else:
+            self.outbox.enqueue_many(recipients, text, parse_mode, kind)
+            if self._wakeup is not None:
+                self._wakeup.set()
+            report = DeliveryReport(total=len(recipients), queued=[username for username, _ in recipients])
+        report.total += len(skipped)
+        report.skipped.update(skipped)
+        return report
+
+    async def broadcast(self, recipients: List[Tuple[str, int]], text: str, parse_mode: Optional[str] = None,
+                        on_progress: Optional[Callable[[DeliveryReport, int], Awaitable[None]]] = None,
+                        chunk_size: int = 30) -> DeliveryReport:
+        """Рассылка напрямую (минуя очередь) порциями через ограничитель; on_progress(report, обработано) после каждой"""
+        recipients, skipped = self._split_reachable(recipients)
+        report = DeliveryReport(total=len(recipients) + len(skipped), skipped=skipped)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def deliver(username: str, chat_id: int):
+            async with semaphore:
+                for _ in range(2):
+                    try:
+                        await self._deliver(chat_id, text, parse_mode)
+                    except RetryAfter as e:
+                        # Ограничитель уже придержал этот чат - ждем и пробуем еще раз
+                        await asyncio.sleep(float(e.retry_after))
+                        continue
+                    except TelegramError as e:
+                        report.failed[username] = str(e)
+                        self._remember_failure(username, chat_id, e)
+                    except Exception as e:
+                        report.failed[username] = f"{type(e).__name__}: {e}"
+                    else:
+                        report.sent.append(username)
+                    return
+                report.failed[username] = "Telegram просит подождать (RetryAfter)"
+
+        for start in range(0, len(recipients), chunk_size):
+            chunk = recipients[start:start + chunk_size]
+            await asyncio.gather(*(deliver(username, chat_id) for username, chat_id in chunk))
+            if on_progress is not None:
+                await on_progress(report, start + len(chunk))
+        return report
+
+    # ============== СВОДКИ ==============
+
+    @staticmethod
+    def _normalize_mode(mode: Optional[str], default: str) -> str:
+        try:
+            return NotifyMode((mode or "").strip().lower()).value
+        except ValueError:
+            return default
+
+    def _flush_at(self, mode: str, now: float) -> float:
+        """Когда отправлять сводку, открытую сейчас"""
+        if mode == NotifyMode.DAILY.value:
+            moment = datetime.fromtimestamp(now)
+            send_at = moment.replace(hour=config.DIGEST_DAILY_HOUR, minute=0, second=0, microsecond=0)
+            if send_at <= moment:
+                send_at += timedelta(days=1)
+            return send_at.timestamp()
+        return now + config.DIGEST_WINDOW_SECONDS
+
+    async def _flush_digests(self):
+        """Отправить все созревшие сводки"""
+        if self.digest is None:
+            return
+        for recipient in self.digest.due_recipients():
+            items = self.digest.take(recipient)
+            if not items:
+                continue
+            text = render_digest(items)
+            if text is None:
+                continue
+            chat_id = items[-1]["chat_id"]
+            report = await self._dispatch([(recipient, chat_id)], text, parse_mode='HTML', kind="digest")
+            print(f"🗞️  Сводка для @{recipient} ({len(items)} изменений): {report.summary()}")
+
+    # ============== ФОНОВЫЙ ВОРКЕР ==============
+
+    def start_worker(self):
+        """Запустить фоновую отправку очереди и сводок (вызывать внутри работающего цикла событий)"""
+        if (self.outbox is None and self.digest is None) or self._worker_task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._worker_task = asyncio.create_task(self._run_worker())
+
+    async def stop_worker(self):
+        if self._worker_task is None:
+            return
+        self._worker_task.cancel()
         try:
-            admins = firebase_service.get_admin_chat_ids()
+            await self._worker_task
+        except asyncio.CancelledError:
+            pass
+        self._worker_task = None
+        print(f"🛑 Воркер уведомлений остановлен ({self._pending_summary()})")
+
+    def _pending_summary(self) -> str:
+        outbox = self.outbox.pending_count() if self.outbox else 0
+        digest = self.digest.pending_count() if self.digest else 0
+        return f"ожидают отправки: {outbox}, в сводках: {digest}"
+
+    async def _run_worker(self):
+        print(f"📮 Воркер уведомлений запущен ({self._pending_summary()})")
+        while True:
+            try:
+                self._wakeup.clear()
+                self._purge_outbox()
+                await self._flush_digests()
+                rows = self.outbox.due(limit=config.OUTBOX_BATCH_SIZE) if self.outbox else []
+                if rows:
+                    await self._drain(rows)
+                    continue
+
+                # Спим до ближайшей попытки/сводки или до нового сообщения
+                moments = [
+                    source.next_due_at() if source is self.outbox else source.next_flush_at()
+                    for source in (self.outbox, self.digest) if source is not None
+                ]
+                moments = [moment for moment in moments if moment is not None]
+                if self.outbox is not None:
+                    moments.append(self._purged_at + OUTBOX_PURGE_INTERVAL)
+                timeout = max(0.0, min(moments) - time.time()) if moments else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Ошибка воркера очереди уведомлений: {e}")
+                await asyncio.sleep(1)
+
+    def _purge_outbox(self):
+        """Раз в OUTBOX_PURGE_INTERVAL удалить недоставленные сообщения старше OUTBOX_RETENTION_DAYS"""
+        now = time.time()
+        if self.outbox is None or now - self._purged_at < OUTBOX_PURGE_INTERVAL:
+            return
+        self._purged_at = now
+        removed = self.outbox.purge(now - config.OUTBOX_RETENTION_DAYS * 86400)
+        if removed:
+            print(f"🧹 Из очереди уведомлений удалено старых записей: {removed}")
+
+    def _retry_delay(self, attempts: int) -> float:
+        delay = min(config.OUTBOX_RETRY_MAX_DELAY, config.OUTBOX_RETRY_BASE_DELAY * 2 ** attempts)
+        return random.uniform(delay / 2, delay)
+
+    async def _drain(self, rows: List[Dict[str, Any]]):
+        """Отправить пачку сообщений из очереди и разнести результаты"""
+        report = DeliveryReport(total=len(rows))
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def process(row: Dict[str, Any]):
+            recipient = row["recipient"]
+            if self.unreachable is not None and self.unreachable.is_unreachable(row["chat_id"]):
+                # Чат стал недоступен уже после постановки в очередь
+                self.outbox.mark_failed(row["id"], "чат недоступен")
+                report.skipped[recipient] = "чат недоступен"
+                return
+            async with semaphore:
+                try:
+                    await self._deliver(row["chat_id"], row["text"], row["parse_mode"])
+                except RetryAfter as e:
+                    # Telegram сам сказал, когда можно повторить
+                    self.outbox.mark_retry(row["id"], float(e.retry_after), str(e))
+                    report.queued.append(recipient)
+                except (Forbidden, BadRequest) as e:
+                    # Повтор не поможет: бот заблокирован, чата нет или сообщение некорректно
+                    self.outbox.mark_failed(row["id"], str(e))
+                    report.failed[recipient] = str(e)
+                    self._remember_failure(recipient, row["chat_id"], e)
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    if row["attempts"] + 1 >= config.OUTBOX_MAX_ATTEMPTS:
+                        self.outbox.mark_failed(row["id"], error)
+                        report.failed[recipient] = error
+                    else:
+                        self.outbox.mark_retry(row["id"], self._retry_delay(row["attempts"]), error)
+                        report.queued.append(recipient)
+                else:
+                    self.outbox.mark_sent(row["id"])
+                    report.sent.append(recipient)
+
+        await asyncio.gather(*(process(row) for row in rows))
+
+        for recipient, error in report.failed.items():
+            print(f"❌ Уведомление @{recipient} не доставлено: {error}")
+        print(f"📮 Очередь уведомлений: {report.summary()}")
+
+    async def notify_admins_task_update(self, firebase_service, task, old_status, new_status,
+                                        username: str = "") -> DeliveryReport:
+        """Уведомить администраторов об изменении статуса задания (сразу или в сводке)"""
+        try:
+            admins = await firebase_service.get_admin_recipients()
             
             if not admins:
                 print("⚠️  Нет администраторов с chat_id")
-                return
+                return DeliveryReport()
             
-            status_names = {
-                "not_started": "Не начато",
-                "in_progress": "В процессе",
-                "completed": "Завершено"
-            }
+            instant = []
+            buffered = []
+            skipped = {}
+            now = time.time()
+            for telegram, chat_id, mode in admins:
+                if self.unreachable is not None and self.unreachable.is_unreachable(chat_id):
+                    skipped[telegram] = "чат недоступен"
+                    continue
+                mode = self._normalize_mode(mode, self.default_mode)
+                if self.digest is None or mode == NotifyMode.INSTANT.value:
+                    instant.append((telegram, chat_id))
+                else:
+                    buffered.append((telegram, chat_id, self._flush_at(mode, now)))
             
-            # Форматируем исполнителей с экранированием
-            if isinstance(task.assigned_to, list):
-                assigned_users = ', '.join(f'@{user}' for user in task.assigned_to)
-            else:
-                assigned_users = f'@{task.assigned_to}' if task.assigned_to else "не назначен"
+            report = DeliveryReport()
+            if buffered:
+                self.digest.add_many(buffered, task.id or "", task.title, username or "?", old_status, new_status)
+                if self._wakeup is not None:
+                    self._wakeup.set()
             
-            # Экранируем все текстовые поля
-            message = (
-                f"📢 *Обновление статуса задания*\n\n"
-                f"📋 *Задание:* {escape_markdown(task.title)}\n"
-                f"👤 *Исполнитель:* {escape_markdown(assigned_users)}\n"
-                f"📊 *Статус был:* {escape_markdown(status_names.get(old_status, old_status))}\n"
-                f"📈 *Статус стал:* {escape_markdown(status_names.get(new_status, new_status))}\n"
-                f"🕐 *Время изменения:* {escape_markdown(task.updated_at if hasattr(task, 'updated_at') else 'только что')}"
-            )
+            if instant:
+                report = await self._dispatch(
+                    instant,
+                    render_status_update(task, username, old_status, new_status),
+                    parse_mode='HTML',
+                    kind="status_update"
+                )
             
-            success_count = 0
-            for admin_username, chat_id in admins:
-                try:
-                    await self.bot.send_message(
-                        chat_id=chat_id,
-                        text=message,
-                        parse_mode='MarkdownV2'  # Попробуйте MarkdownV2, он более строгий
-                    )
-                    print(f"✅ Уведомление отправлено администратору @{admin_username}")
-                    success_count += 1
-                except TelegramError as e:
-                    print(f"❌ Ошибка отправки администратору @{admin_username}: {e}")
-                    # Пробуем отправить без разметки
-                    try:
-                        await self.bot.send_message(
-                            chat_id=chat_id,
-                            text=message.replace('*', '').replace('_', ''),  # Убираем разметку
-                            parse_mode=None
-                        )
-                        print(f"✅ Уведомление отправлено без разметки")
-                        success_count += 1
-                    except Exception as e2:
-                        print(f"❌ Даже без разметки не отправилось: {e2}")
-                except Exception as e:
-                    print(f"❌ Неизвестная ошибка: {e}")
-            
-            print(f"📊 Итого: отправлено {success_count}/{len(admins)} уведомлений")
+            report.total += len(buffered) + len(skipped)
+            report.queued.extend(telegram for telegram, _, _ in buffered)
+            report.skipped.update(skipped)
+            print(f"📊 Уведомление администраторов: {report.summary()} (в сводки: {len(buffered)})")
+            return report
             
         except Exception as e:
             print(f"❌ Ошибка в notify_admins_task_update: {e}")
             import traceback
             traceback.print_exc()
+            return DeliveryReport()
     
-    async def notify_member_new_task(self, firebase_service, task):
-        """Уведомить участника о новом задании"""
+    async def notify_member_new_task(self, firebase_service, task) -> DeliveryReport:
+        """Уведомить участников о новом задании"""
         try:
-            # Для многопользовательских заданий
-            if isinstance(task.assigned_to, list):
-                for username in task.assigned_to:
-                    await self._notify_single_member(firebase_service, username, task)
-            else:
-                # Для одиночных заданий
-                await self._notify_single_member(firebase_service, task.assigned_to, task)
+            usernames = task.assigned_to if isinstance(task.assigned_to, list) else [task.assigned_to]
+            chat_ids = await firebase_service.get_chat_ids(usernames)
+            
+            recipients = []
+            skipped = {}
+            for username in usernames:
+                chat_id = chat_ids.get(username)
+                if not chat_id:
+                    skipped[username] = "нет chat_id"
+                else:
+                    recipients.append((username, chat_id))
+            
+            report = await self._dispatch(recipients, render_new_task(task), parse_mode='HTML', kind="new_task")
+            report.total += len(skipped)
+            report.skipped.update(skipped)
+            print(f"📊 Уведомление о новом задании: {report.summary()}")
+            return report
                 
         except Exception as e:
             print(f"❌ Ошибка в notify_member_new_task: {e}")
             import traceback
             traceback.print_exc()
+            return DeliveryReport()
 
-    async def _notify_single_member(self, firebase_service, username, task):
-        """Уведомить одного участника"""
+    async def notify_deadline_reminder(self, firebase_service, username: str, tasks) -> DeliveryReport:
+        """Напомнить участнику о приближающихся дедлайнах"""
         try:
-            chat_id = firebase_service.get_member_chat_id(username)
+            chat_ids = await firebase_service.get_chat_ids([username])
+            if username not in chat_ids:
+                return DeliveryReport(total=1, skipped={username: "нет chat_id"})
             
-            if not chat_id or chat_id <= 0:
-                print(f"⚠️  У участника @{username} нет chat_id или он невалиден (значение: {chat_id})")
-                return
+            today = datetime.now().date()
+            deadlines = [parse_deadline(task.deadline) for task in tasks]
+            days_left = [(deadline - today).days if deadline else None for deadline in deadlines]
             
-            message = (
-                f"🎯 *Новое задание!*\n\n"
-                f"📋 *Название:* {task.title}\n"
-                f"📝 *Описание:* {task.description}\n"
-                f"👤 *Выдал:* @{task.assigned_by}\n"
+            report = await self._dispatch(
+                [(username, chat_ids[username])],
+                render_deadline_reminder(tasks, days_left),
+                parse_mode='HTML',
+                kind="reminder"
             )
-            
-            if task.deadline:
-                message += f"📅 *Дедлайн:* {task.deadline}\n"
-            
-            message += f"\nНажмите '📋 Мои задания' для просмотра"
-            
-            await self.bot.send_message(
-                chat_id=chat_id,
-                text=message,
-                parse_mode='Markdown'
-            )
-            print(f"✅ Уведомление о новом задании отправлено @{username} (chat_id: {chat_id})")
-            
-        except TelegramError as e:
-            print(f"❌ Ошибка отправки участнику @{username}: {e}")
+            print(f"⏰ Напоминание @{username} ({len(tasks)} заданий): {report.summary()}")
+            return report
+        
         except Exception as e:
-            print(f"❌ Ошибка при уведомлении @{username}: {e}")
+            print(f"❌ Ошибка в notify_deadline_reminder: {e}")
+            return DeliveryReport()
 
 # Глобальный экземпляр
-notification_service = NotificationService(config.BOT_TOKEN)
\ No newline at end of file
+notification_service = NotificationService(
+    config.BOT_TOKEN,
+    max_concurrency=config.NOTIFY_MAX_CONCURRENCY,
+    outbox=Outbox(config.LOCAL_DB_PATH) if config.OUTBOX_ENABLED else None,
+    digest=DigestBuffer(config.LOCAL_DB_PATH),
+    default_mode=config.ADMIN_NOTIFY_MODE,
+    rate_limiter=rate_limiter,
+    unreachable=unreachable_chats
+)
\ No newline at end of file
@@ -0,0 +1,110 @@
+# outbox.py
+import threading
+import time
+from typing import Optional, List, Dict, Any, Tuple
+from storage import connect
+
+
+class Outbox:
+    """Постоянная очередь исходящих сообщений (SQLite).
+
+    Обработчики только добавляют строки; фоновый воркер NotificationService
+    забирает созревшие сообщения, отправляет их и переносит неудачные
+    попытки на будущее. Неотправленное переживает перезапуск процесса.
+    """
+
+    def __init__(self, path: str = None):
+        self._lock = threading.Lock()
+        self.conn = connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                recipient TEXT NOT NULL,
+                chat_id INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                parse_mode TEXT,
+                kind TEXT NOT NULL DEFAULT '',
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+        """)
+
+    def enqueue_many(self, recipients: List[Tuple[str, int]], text: str, parse_mode: Optional[str] = None,
+                     kind: str = "") -> int:
+        """Поставить одно сообщение в очередь для нескольких получателей (одна транзакция)"""
+        now = time.time()
+        rows = [
+            (recipient, chat_id, text, parse_mode, kind, now, now)
+            for recipient, chat_id in recipients
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(
+                    "INSERT INTO outbox (recipient, chat_id, text, parse_mode, kind, next_attempt_at, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+        return len(rows)
+
+    def enqueue(self, recipient: str, chat_id: int, text: str, parse_mode: Optional[str] = None,
+                kind: str = "") -> int:
+        return self.enqueue_many([(recipient, chat_id)], text, parse_mode, kind)
+
+    def due(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Сообщения, которые пора отправлять"""
+        with self._lock:
+            cursor = self.conn.execute(
+                "SELECT * FROM outbox WHERE status = 'pending' AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at, id LIMIT ?",
+                (time.time(), limit)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def next_due_at(self) -> Optional[float]:
+        """Время ближайшей запланированной отправки"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending'"
+            ).fetchone()
+            return row[0] if row else None
+
+    def mark_sent(self, message_id: int):
+        with self._lock:
+            self.conn.execute("DELETE FROM outbox WHERE id = ?", (message_id,))
+
+    def mark_retry(self, message_id: int, delay: float, error: str):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                (time.time() + delay, error, message_id)
+            )
+
+    def mark_failed(self, message_id: int, error: str):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE outbox SET status = 'failed', attempts = attempts + 1, last_error = ? WHERE id = ?",
+                (error, message_id)
+            )
+
+    def purge(self, older_than: float) -> int:
+        """Удалить завершенные сообщения, созданные раньше older_than (unix time)"""
+        with self._lock:
+            cursor = self.conn.execute(
+                "DELETE FROM outbox WHERE status != 'pending' AND created_at < ?", (older_than,)
+            )
+            return cursor.rowcount
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
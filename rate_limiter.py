@@ -0,0 +1,155 @@
+# rate_limiter.py
+import asyncio
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Union
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from config import config
+
+# rate_limit_args для массовых рассылок: они уступают место ответам пользователям
+BULK = {"priority": "bulk"}
+
+# Сколько простаивающих ведер чатов держать, прежде чем чистить
+MAX_CHAT_BUCKETS = 5000
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, запас не больше capacity"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, reserve: float = 0.0) -> float:
+        """Взять токен, если после этого останется не меньше reserve; иначе вернуть время ожидания"""
+        self._refill()
+        if self.tokens >= 1 + reserve:
+            self.tokens -= 1
+            return 0.0
+        return (1 + reserve - self.tokens) / self.rate
+
+    def penalize(self, seconds: float):
+        """Не выдавать токены ближайшие seconds секунд (ответ RetryAfter)"""
+        self._refill()
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+    @property
+    def is_idle(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class FloodControlLimiter(BaseRateLimiter[Dict[str, Any]]):
+    """Планировщик отправки с учетом лимитов Telegram.
+
+    Каждый запрос с chat_id берет токен из ведра чата (~1/с в личке,
+    ~20/мин в группах) и из общего ведра (~30/с). Массовые рассылки
+    (rate_limit_args=BULK) не могут выбрать последние токены, поэтому
+    ответы пользователям не стоят в очереди за уведомлениями.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30,
+        chat_rate: float = 1,
+        group_rate: float = 20 / 60,
+        chat_burst: float = 3,
+        bulk_reserve: float = 0.2,
+        max_retries: int = 3
+    ):
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: Dict[Union[int, str], TokenBucket] = {}
+        # Доля запаса, который рассылки не трогают
+        self._global_reserve = global_rate * bulk_reserve
+        self._chat_reserve = 1.0
+        self._paused_until = 0.0
+        self.stats = {"requests": 0, "throttled": 0, "retry_after": 0}
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def _chat_bucket(self, chat_id: Union[int, str]) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_CHAT_BUCKETS:
+                self._chats = {key: value for key, value in self._chats.items() if not value.is_idle}
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            rate = self.group_rate if is_group else self.chat_rate
+            burst = 1.0 if is_group else max(1.0, self.chat_burst)
+            bucket = TokenBucket(rate, burst + self._chat_reserve)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    async def _acquire(self, bucket: TokenBucket, reserve: float) -> bool:
+        """Дождаться токена; True - если пришлось ждать"""
+        waited = False
+        while True:
+            wait = bucket.try_take(reserve)
+            if wait <= 0:
+                return waited
+            waited = True
+            await asyncio.sleep(wait)
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], List[Dict[str, Any]]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[Dict[str, Any]],
+    ) -> Union[bool, Dict[str, Any], List[Dict[str, Any]]]:
+        chat_id = data.get("chat_id")
+        bulk = bool(rate_limit_args) and rate_limit_args.get("priority") == BULK["priority"]
+        # Рассылки при RetryAfter отдают сообщение обратно в очередь, ответы пользователям повторяем здесь
+        retries_left = 0 if bulk else self.max_retries
+        self.stats["requests"] += 1
+
+        while True:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+
+            # Лимиты Telegram касаются только запросов, адресованных чату
+            if chat_id is not None:
+                waited = await self._acquire(self._chat_bucket(chat_id), self._chat_reserve if bulk else 0.0)
+                waited = await self._acquire(self._global, self._global_reserve if bulk else 0.0) or waited
+                if waited:
+                    self.stats["throttled"] += 1
+
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                self.stats["retry_after"] += 1
+                print(f"⏳ Telegram просит подождать {e.retry_after} с ({endpoint}, chat_id {chat_id})")
+                if chat_id is not None:
+                    self._chat_bucket(chat_id).penalize(float(e.retry_after))
+                else:
+                    self._paused_until = max(self._paused_until, time.monotonic() + float(e.retry_after))
+                if retries_left <= 0:
+                    raise
+                retries_left -= 1
+
+
+# Глобальный экземпляр (общий для бота приложения и сервиса уведомлений)
+rate_limiter = FloodControlLimiter(
+    global_rate=config.TELEGRAM_GLOBAL_RATE,
+    chat_rate=config.TELEGRAM_CHAT_RATE,
+    group_rate=config.TELEGRAM_GROUP_RATE,
+    chat_burst=config.TELEGRAM_CHAT_BURST,
+    max_retries=config.TELEGRAM_MAX_RETRIES
+)
@@ -0,0 +1,158 @@
+# realtime_sync.py
+import threading
+import time
+from typing import Optional, Dict, Any
+from cache import member_directory, task_store
+
+
+class NodeStream:
+    """Подписка на один узел Firebase, применяющая события к локальному кэшу"""
+
+    def __init__(self, firebase, node: str, store):
+        self.firebase = firebase
+        self.node = node
+        self.store = store
+        self.default_ttl = store.ttl
+        self.stream = None
+        self.last_event_at: Optional[float] = None
+        self.failures = 0
+        self._generation = 0
+
+    @property
+    def is_alive(self) -> bool:
+        return (
+            self.stream is not None
+            and self.stream.thread is not None
+            and self.stream.thread.is_alive()
+        )
+
+    def connect(self):
+        """Открыть поток; первое событие - полный снимок узла (ресинхронизация)"""
+        self.close()
+        db = self.firebase.database()
+        generation = self._generation
+
+        def handler(message: Dict[str, Any]):
+            # События брошенного потока (если он все же подключится после close) не применяем
+            if generation == self._generation:
+                self._handle(message)
+
+        self.stream = db.child(self.node).stream(handler, stream_id=self.node)
+        print(f"📡 Подписка на /{self.node} открыта")
+
+    def close(self, timeout: float = 5):
+        stream, self.stream = self.stream, None
+        self._generation += 1
+        if stream is None:
+            return
+        # pyrebase Stream.close() бесконечно ждет stream.sse: если подключение не состоялось
+        # (ошибка DNS/TLS/401), закрывать нечего - просто отпускаем ссылку
+        thread = getattr(stream, "thread", None)
+        if getattr(stream, "sse", None) is None or thread is None or not thread.is_alive():
+            return
+        # Живой поток закрываем в отдельном потоке, чтобы не повесить watchdog и stop()
+        closer = threading.Thread(target=self._close_stream, args=(stream,), name=f"close-{self.node}", daemon=True)
+        closer.start()
+        closer.join(timeout)
+        if closer.is_alive():
+            print(f"⚠️  Поток /{self.node} не закрылся за {timeout} с - оставляем его")
+
+    def _close_stream(self, stream):
+        try:
+            stream.close()
+        except Exception as e:
+            print(f"⚠️  Ошибка закрытия потока /{self.node}: {e}")
+
+    def mark_down(self):
+        """Поток потерян: кэш снова живет по TTL, пока подписка не восстановится"""
+        self.store.ttl = self.default_ttl
+
+    def _handle(self, message: Dict[str, Any]):
+        event = message.get("event")
+        path = message.get("path") or "/"
+        data = message.get("data")
+        segments = [part for part in path.split("/") if part]
+
+        try:
+            if event == "put":
+                self.store.apply(segments, data)
+            elif event == "patch":
+                for key, value in (data or {}).items():
+                    self.store.apply(segments + [part for part in key.split("/") if part], value)
+            elif event in ("cancel", "auth_revoked"):
+                print(f"⚠️  Поток /{self.node} отменен сервером: {event}")
+                self.store.invalidate()
+                self.mark_down()
+                return
+            else:
+                return
+        except Exception as e:
+            # Не смогли применить событие - полностью перечитаем узел при следующем чтении
+            print(f"❌ Ошибка применения события /{self.node}{path}: {e}")
+            self.store.invalidate()
+            return
+
+        if segments == [] and event == "put":
+            # Получен полный снимок - дальше кэш поддерживается событиями
+            self.store.ttl = 0
+            self.failures = 0
+        self.last_event_at = time.monotonic()
+
+
+class RealtimeSync:
+    """Фоновая синхронизация кэшей /members и /tasks через realtime-потоки"""
+
+    def __init__(self, firebase, check_interval: float = 15, max_backoff: float = 300):
+        self.check_interval = check_interval
+        self.max_backoff = max_backoff
+        self.streams = [
+            NodeStream(firebase, "members", member_directory),
+            NodeStream(firebase, "tasks", task_store),
+        ]
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+        self._next_attempt: Dict[str, float] = {}
+
+    def start(self):
+        if self._watchdog is not None:
+            return
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="realtime-sync", daemon=True)
+        self._watchdog.start()
+        print("✅ Realtime-синхронизация запущена")
+
+    def stop(self):
+        self._stop.set()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=self.check_interval)
+            self._watchdog = None
+        for node_stream in self.streams:
+            node_stream.close()
+            node_stream.mark_down()
+        print("🛑 Realtime-синхронизация остановлена")
+
+    def _watch(self):
+        """Следить за потоками и переподключать упавшие с экспоненциальной задержкой"""
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for node_stream in self.streams:
+                if node_stream.is_alive:
+                    continue
+                if now < self._next_attempt.get(node_stream.node, 0):
+                    continue
+
+                if node_stream.stream is not None:
+                    print(f"⚠️  Поток /{node_stream.node} оборвался, переподключаюсь")
+                    node_stream.mark_down()
+                    node_stream.failures += 1
+
+                try:
+                    node_stream.connect()
+                except Exception as e:
+                    print(f"❌ Не удалось подписаться на /{node_stream.node}: {e}")
+                    node_stream.mark_down()
+                    node_stream.failures += 1
+
+                backoff = min(self.max_backoff, 2 ** node_stream.failures)
+                self._next_attempt[node_stream.node] = now + backoff
+            self._stop.wait(self.check_interval)
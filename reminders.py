@@ -0,0 +1,199 @@
+# reminders.py
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta, time as day_time
+from typing import Optional, List, Dict, Any, Tuple
+from telegram.ext import ContextTypes, JobQueue
+from cache import TaskStore, task_store
+from config import config
+from models import TaskStatus, parse_deadline
+
+
+class ReminderScheduler:
+    """Напоминания о дедлайнах поверх JobQueue.
+
+    Дедлайн разбирается один раз при изменении задания, ближайшие напоминания
+    по незавершенным статусам лежат в куче, а в JobQueue стоит одна задача -
+    на вершину кучи. Изменение дедлайна или состава незавершивших исполнителей
+    повышает версию задания; записи старых версий отбрасываются при извлечении,
+    а когда их становится больше актуальных - куча пересобирается.
+    """
+
+    def __init__(self, task_store: TaskStore, days_before: List[int], hour: int):
+        self.task_store = task_store
+        self.days_before = sorted(set(days_before), reverse=True)
+        self.hour = hour
+        self._lock = threading.Lock()
+        self._heap: List[Tuple[float, int, str, str, int]] = []  # (время, порядок, task_id, username, версия)
+        self._versions: Dict[str, int] = {}
+        self._signatures: Dict[str, tuple] = {}  # task_id -> (дедлайн, незавершившие исполнители)
+        self._live: Dict[str, int] = {}          # task_id -> число актуальных записей в куче
+        self._live_total = 0
+        self._seq = itertools.count()
+        self._job_queue: Optional[JobQueue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._job = None
+        self._job_at: Optional[float] = None
+
+    def start(self, job_queue: JobQueue):
+        """Подписаться на хранилище заданий и запланировать ближайшее напоминание"""
+        self._job_queue = job_queue
+        self._loop = asyncio.get_running_loop()
+        self.task_store.add_listener(self._on_task_change)
+        self.rebuild()
+
+    def stop(self):
+        if self._job is not None:
+            self._job.schedule_removal()
+        self._job = None
+        self._job_at = None
+        self._job_queue = None
+
+    def _remind_times(self, deadline: Optional[str]) -> List[float]:
+        """Моменты напоминаний для дедлайна (только будущие)"""
+        deadline_date = parse_deadline(deadline)
+        if deadline_date is None:
+            return []
+        now = time.time()
+        times = []
+        for days in self.days_before:
+            moment = datetime.combine(deadline_date - timedelta(days=days), day_time(self.hour))
+            timestamp = moment.timestamp()
+            if timestamp > now:
+                times.append(timestamp)
+        return times
+
+    def _entries(self, task_id: str, task_data: Optional[Dict[str, Any]], version: int) -> List[tuple]:
+        if not task_data:
+            return []
+        times = self._remind_times(task_data.get("deadline"))
+        if not times:
+            return []
+        statuses = task_data.get("status") or {}
+        entries = []
+        for username in task_data.get("assigned_to") or []:
+            if statuses.get(username, TaskStatus.NOT_STARTED.value) == TaskStatus.COMPLETED.value:
+                continue
+            for when in times:
+                entries.append((when, next(self._seq), task_id, username, version))
+        return entries
+
+    def _signature(self, task_data: Optional[Dict[str, Any]]) -> Optional[tuple]:
+        """От чего зависят напоминания задания: дедлайн и кто его еще не завершил"""
+        if not task_data:
+            return None
+        statuses = task_data.get("status") or {}
+        pending = frozenset(
+            username for username in task_data.get("assigned_to") or []
+            if statuses.get(username, TaskStatus.NOT_STARTED.value) != TaskStatus.COMPLETED.value
+        )
+        return task_data.get("deadline"), pending
+
+    def rebuild(self):
+        """Пересобрать кучу по всем заданиям хранилища"""
+        snapshot = self.task_store.snapshot()
+        with self._lock:
+            self._versions = {task_id: 0 for task_id in snapshot}
+            self._signatures = {task_id: self._signature(task_data) for task_id, task_data in snapshot.items()}
+            self._live = {}
+            heap = []
+            for task_id, task_data in snapshot.items():
+                entries = self._entries(task_id, task_data, 0)
+                self._live[task_id] = len(entries)
+                heap.extend(entries)
+            heapq.heapify(heap)
+            self._heap = heap
+            self._live_total = len(heap)
+        print(f"⏰ Напоминания о дедлайнах: запланировано {len(heap)}")
+        self._wake()
+
+    def _on_task_change(self, task_id: Optional[str], task_data: Optional[Dict[str, Any]]):
+        """Подписчик TaskStore (может вызываться из любого потока)"""
+        if task_id is None:
+            self.rebuild()
+            return
+        signature = self._signature(task_data)
+        with self._lock:
+            # Смена статуса без завершения, комментарий, эхо собственной записи - напоминания те же
+            if signature == self._signatures.get(task_id):
+                return
+            if signature is None:
+                self._signatures.pop(task_id, None)
+            else:
+                self._signatures[task_id] = signature
+            version = self._versions.get(task_id, 0) + 1
+            self._versions[task_id] = version
+            entries = self._entries(task_id, task_data, version)
+            for entry in entries:
+                heapq.heappush(self._heap, entry)
+            self._live_total += len(entries) - self._live.pop(task_id, 0)
+            if entries:
+                self._live[task_id] = len(entries)
+            if len(self._heap) - self._live_total > self._live_total:
+                self._compact()
+        self._wake()
+
+    def _compact(self):
+        """Убрать из кучи записи старых версий (вызывается под блокировкой)"""
+        self._heap = [entry for entry in self._heap if entry[4] == self._versions.get(entry[2])]
+        heapq.heapify(self._heap)
+
+    def _wake(self):
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._reschedule)
+
+    def _reschedule(self):
+        """Поставить задачу JobQueue на ближайшее актуальное напоминание"""
+        if self._job_queue is None:
+            return
+        with self._lock:
+            # Устаревшие записи на вершине выбрасываем сразу
+            while self._heap and self._heap[0][4] != self._versions.get(self._heap[0][2]):
+                heapq.heappop(self._heap)
+            head = self._heap[0][0] if self._heap else None
+        if head == self._job_at:
+            return
+        if self._job is not None:
+            self._job.schedule_removal()
+            self._job = None
+        self._job_at = head
+        if head is not None:
+            self._job = self._job_queue.run_once(self._fire, when=max(0.0, head - time.time()), name="deadline_reminders")
+
+    def _pop_due(self) -> Dict[str, List[str]]:
+        """Извлечь созревшие напоминания: username -> [task_id]"""
+        due: Dict[str, List[str]] = {}
+        now = time.time()
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, task_id, username, version = heapq.heappop(self._heap)
+                if version != self._versions.get(task_id):
+                    continue
+                self._live_total -= 1
+                self._live[task_id] -= 1
+                if not self._live[task_id]:
+                    del self._live[task_id]
+                task_ids = due.setdefault(username, [])
+                if task_id not in task_ids:
+                    task_ids.append(task_id)
+        return due
+
+    async def _fire(self, context: ContextTypes.DEFAULT_TYPE):
+        self._job = None
+        self._job_at = None
+        from firebase_service import async_firebase_service
+        from notifications import notification_service
+
+        for username, task_ids in self._pop_due().items():
+            tasks = [task for task in (self.task_store.get(task_id) for task_id in task_ids) if task]
+            tasks = [task for task in tasks if task.status.get(username) != TaskStatus.COMPLETED]
+            if tasks:
+                await notification_service.notify_deadline_reminder(async_firebase_service, username, tasks)
+        self._reschedule()
+
+
+# Глобальный экземпляр
+reminder_scheduler = ReminderScheduler(task_store, days_before=config.REMINDER_DAYS_BEFORE, hour=config.REMINDER_HOUR)
@@ -0,0 +1,288 @@
+# rendering.py
+import threading
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Callable, Hashable
+from cache import member_directory, task_store
+from models import Member, Task, TaskStatus
+
+# Таблица экранирования: один проход str.translate вместо посимвольной сборки строки
+_HTML_TABLE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"})
+
+STATUS_NAMES = {
+    "not_started": "Не начато",
+    "in_progress": "В процессе",
+    "completed": "Завершено"
+}
+
+STATUS_EMOJI = {
+    "not_started": "🟡",
+    "in_progress": "🟠",
+    "completed": "🟢"
+}
+
+# Запас до лимита Telegram в 4096 символов
+MAX_MESSAGE_LENGTH = 3800
+
+
+def escape_html(text: Any) -> str:
+    """Экранирует текст для parse_mode='HTML'"""
+    if text is None:
+        return ""
+    return str(text).translate(_HTML_TABLE)
+
+
+def user_status(task: Task, username: str) -> TaskStatus:
+    """Статус задания для конкретного исполнителя (не начато, если не задан)"""
+    status = task.status.get(username) if isinstance(task.status, dict) else task.status
+    try:
+        return TaskStatus(status)
+    except ValueError:
+        return TaskStatus.NOT_STARTED
+
+
+def status_name(status: Any) -> str:
+    value = status.value if isinstance(status, TaskStatus) else str(status)
+    return STATUS_NAMES.get(value, value)
+
+
+class FragmentCache:
+    """LRU-кэш отрендеренных фрагментов по ключу (вид, сущность, версия, ...)"""
+
+    def __init__(self, max_size: int = 2048):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._fragments: "OrderedDict[Hashable, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Optional[Hashable], render: Callable[[], str]) -> str:
+        """Вернуть фрагмент из кэша или отрендерить; key=None - без кэширования"""
+        if key is None:
+            return render()
+        with self._lock:
+            text = self._fragments.get(key)
+            if text is not None:
+                self._fragments.move_to_end(key)
+                self.hits += 1
+                return text
+            self.misses += 1
+        text = render()
+        with self._lock:
+            self._fragments[key] = text
+            if len(self._fragments) > self.max_size:
+                self._fragments.popitem(last=False)
+        return text
+
+
+fragments = FragmentCache()
+
+
+def _task_key(kind: str, task: Task, *extra) -> Optional[tuple]:
+    # Кэшируем только актуальные объекты хранилища: версия однозначно определяет содержимое
+    version = task_store.version_of(task)
+    return None if version is None else (kind, task.id, version) + extra
+
+
+def _member_key(kind: str, member: Member, *extra) -> Optional[tuple]:
+    version = member_directory.version_of(member)
+    return None if version is None else (kind, member.id, version) + extra
+
+
+# ============== ШАБЛОНЫ ==============
+
+TASK_CARD = (
+    "📋 <b>{title}</b>\n\n{status_emoji} {status}"
+    "{description}"
+    "{assignees}"
+    "\n👑 <b>Выдал:</b> @{assigned_by}"
+    "\n🕐 <b>Создано:</b> {created_at}"
+    "{deadline}"
+)
+
+MEMBER_CARD = (
+    "👤 <b>Информация о члене клуба:</b>\n\n"
+    "<b>ФИО (рус):</b> {full_name_ru}\n"
+    "<b>ФИО (англ):</b> {full_name_en}\n"
+    "<b>Telegram:</b> @{telegram}\n"
+    "<b>Группа:</b> {group}\n"
+    "<b>Тип личности:</b> {personality_type}\n"
+    "<b>Дата рождения:</b> {birth_date}\n"
+    "<b>Роль:</b> {role}\n\n"
+    "<b>Активные задания:</b>"
+)
+
+STATUS_UPDATE = (
+    "📢 <b>Обновление статуса задания</b>\n\n"
+    "📋 <b>Задание:</b> {title}\n"
+    "👤 <b>Исполнитель:</b> {assignees}\n"
+    "📊 <b>Статус был:</b> {old_status}\n"
+    "📈 <b>Статус стал:</b> {new_status}\n"
+    "🕐 <b>Время изменения:</b> {updated_at}"
+)
+
+NEW_TASK = (
+    "🎯 <b>Новое задание!</b>\n\n"
+    "📋 <b>Название:</b> {title}\n"
+    "📝 <b>Описание:</b> {description}\n"
+    "👤 <b>Выдал:</b> @{assigned_by}\n"
+    "{deadline}"
+    "\nНажмите '📋 Мои задания' для просмотра"
+)
+
+
+# ============== ЗАДАНИЯ ==============
+
+def render_task_card(task: Task, username: str) -> str:
+    """Карточка задания для исполнителя (HTML)"""
+    def render() -> str:
+        status = user_status(task, username).value
+        assignees = task.assigned_to if isinstance(task.assigned_to, list) else [task.assigned_to]
+        if len(assignees) == 1:
+            assignees_text = f"\n\n👤 <b>Исполнитель:</b> @{escape_html(assignees[0])}"
+        else:
+            assignees_text = f"\n\n👥 <b>Исполнители:</b> {len(assignees)} человек"
+            for i, assignee in enumerate(assignees[:3], 1):
+                assignees_text += f"\n  {i}. @{escape_html(assignee)}"
+            if len(assignees) > 3:
+                assignees_text += f"\n  ... и еще {len(assignees) - 3}"
+
+        return TASK_CARD.format(
+            title=escape_html(task.title),
+            status_emoji=STATUS_EMOJI[status],
+            status=STATUS_NAMES[status],
+            description=f"\n\n📝 <b>Описание:</b>\n{escape_html(task.description)}" if task.description else "",
+            assignees=assignees_text,
+            assigned_by=escape_html(task.assigned_by),
+            created_at=escape_html(task.created_at),
+            deadline=f"\n📅 <b>Дедлайн:</b> {escape_html(task.deadline)}" if task.deadline else ""
+        )
+
+    return fragments.get(_task_key("task_card", task, username), render)
+
+
+def render_task_line(task: Task, username: str) -> str:
+    """Строка «• Задание (статус)» для списков"""
+    return fragments.get(
+        _task_key("task_line", task, username),
+        lambda: f"• {escape_html(task.title)} ({status_name(user_status(task, username))})"
+    )
+
+
+def render_status_summary(summary: Dict[str, int]) -> str:
+    """Сводка «Статус заданий» по готовым счетчикам (HTML)"""
+    text = "<b>📊 Статус всех заданий:</b>\n\n"
+    for status, name in STATUS_NAMES.items():
+        text += f"{STATUS_EMOJI[status]} <b>{name}:</b> {summary.get(status, 0)}\n"
+    text += f"\n<b>📈 Всего заданий в системе:</b> {summary.get('tasks', 0)}"
+    text += f"\n<b>👥 Уникальных исполнителей:</b> {summary.get('assignees', 0)}"
+    return text + "\n\nВыберите статус, чтобы посмотреть назначения:"
+
+
+def render_status_page(status: str, items: List[tuple], page: int, total: int, page_size: int) -> str:
+    """Страница назначений в статусе: items - [(task_id, название, username)] (HTML)"""
+    text = f"{STATUS_EMOJI.get(status, '')} <b>{escape_html(status_name(status))}</b> ({total})\n\n"
+    if not items:
+        return text + "Нет заданий"
+    text += "\n".join(f"• {escape_html(title)} (@{escape_html(username)})" for _, title, username in items)
+    pages = (total + page_size - 1) // page_size
+    if pages > 1:
+        text += f"\n\nСтраница {page + 1} из {pages}"
+    return text
+
+
+# ============== УЧАСТНИКИ ==============
+
+def render_member_card(member: Member, tasks: List[Task]) -> str:
+    """Карточка участника с его заданиями (HTML)"""
+    header = fragments.get(
+        _member_key("member_card", member),
+        lambda: MEMBER_CARD.format(**{
+            field: escape_html(getattr(member, field))
+            for field in ("full_name_ru", "full_name_en", "telegram", "group", "personality_type", "birth_date", "role")
+        })
+    )
+    if not tasks:
+        return header + "\nНет активных заданий"
+    return header + "".join("\n" + render_task_line(task, member.telegram) for task in tasks)
+
+
+# ============== УВЕДОМЛЕНИЯ ==============
+
+def render_status_update(task: Task, username: str, old_status: str, new_status: str) -> str:
+    """Сообщение администраторам об изменении статуса (HTML)"""
+    if username:
+        assignees = f"@{username}"
+    elif isinstance(task.assigned_to, list):
+        assignees = ", ".join(f"@{user}" for user in task.assigned_to) or "не назначен"
+    else:
+        assignees = f"@{task.assigned_to}" if task.assigned_to else "не назначен"
+
+    return STATUS_UPDATE.format(
+        title=escape_html(task.title),
+        assignees=escape_html(assignees),
+        old_status=escape_html(status_name(old_status)),
+        new_status=escape_html(status_name(new_status)),
+        updated_at=escape_html(task.updated_at or "только что")
+    )
+
+
+def render_digest(items: List[Dict[str, Any]]) -> Optional[str]:
+    """Сводка изменений статусов, сгруппированная по заданиям (HTML); None - если менять нечего"""
+    # Статус, вернувшийся к исходному, в сводку не попадает
+    changes = [item for item in items if item["old_status"] != item["new_status"]]
+    if not changes:
+        return None
+
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for item in changes:
+        groups.setdefault(item["task_id"], []).append(item)
+
+    text = f"📢 <b>Сводка изменений статусов</b> ({len(changes)})\n"
+    shown = 0
+    for task_items in groups.values():
+        block = f"\n📋 <b>{escape_html(task_items[-1]['task_title'])}</b>\n" + "".join(
+            f"• @{escape_html(item['member'])}: "
+            f"{status_name(item['old_status'])} → {status_name(item['new_status'])}\n"
+            for item in task_items
+        )
+        if len(text) + len(block) > MAX_MESSAGE_LENGTH:
+            break
+        text += block
+        shown += len(task_items)
+
+    if shown < len(changes):
+        text += f"\n…и еще изменений: {len(changes) - shown}"
+    return text
+
+
+def render_new_task(task: Task) -> str:
+    """Сообщение исполнителям о новом задании (HTML)"""
+    return NEW_TASK.format(
+        title=escape_html(task.title),
+        description=escape_html(task.description),
+        assigned_by=escape_html(task.assigned_by),
+        deadline=f"📅 <b>Дедлайн:</b> {escape_html(task.deadline)}\n" if task.deadline else ""
+    )
+
+
+def render_deadline_reminder(tasks: List[Task], days_left: List[Optional[int]]) -> str:
+    """Напоминание о дедлайнах (HTML); days_left - дней до дедлайна для каждого задания"""
+    text = "⏰ <b>Напоминание о дедлайнах</b>\n\n"
+    for task, days in zip(tasks, days_left):
+        when = {0: "сегодня", 1: "завтра"}.get(days, f"до {escape_html(task.deadline)}")
+        text += f"📋 <b>{escape_html(task.title)}</b> - {when}\n"
+    return text + "\nНажмите '📋 Мои задания' для просмотра"
+
+
+def render_broadcast_progress(target: str, total: int, sent: int, failed: int, skipped: int, finished: bool) -> str:
+    """Живой прогресс рассылки (HTML)"""
+    remaining = max(0, total - sent - failed - skipped)
+    title = "✅ Рассылка завершена" if finished else "📣 Идет рассылка..."
+    return (
+        f"<b>{title}</b>\n"
+        f"🎯 Получатели: {escape_html(target)}\n\n"
+        f"📨 Отправлено: {sent}\n"
+        f"❌ Ошибок: {failed}\n"
+        f"⏭️ Пропущено: {skipped}\n"
+        f"⏳ Осталось: {remaining} из {total}"
+    )
@@ -0,0 +1,20 @@
+# storage.py
+import os
+import sqlite3
+from config import config
+
+
+def connect(path: str = None) -> sqlite3.Connection:
+    """Открыть локальную SQLite-базу бота (лежит в томе контейнера)"""
+    path = path or config.LOCAL_DB_PATH
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # autocommit; пакетные записи явно оборачиваются в BEGIN/COMMIT
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    # WAL + synchronous=NORMAL: запись без fsync на каждый коммит, но без потери данных при падении процесса
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
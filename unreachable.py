@@ -0,0 +1,75 @@
+# unreachable.py
+import threading
+import time
+from typing import Optional, List, Dict, Any, Tuple
+from config import config
+from storage import connect
+
+
+class UnreachableRegistry:
+    """Чаты, куда бот не может писать (заблокирован, чат не найден).
+
+    Пополняется по результатам отправки и очищается, когда участник
+    снова нажимает /start. Проверка идет по копии в памяти, без запросов к базе.
+    """
+
+    def __init__(self, path: str = None):
+        self._lock = threading.Lock()
+        self.conn = connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS unreachable_chats (
+                chat_id INTEGER PRIMARY KEY,
+                recipient TEXT NOT NULL DEFAULT '',
+                reason TEXT NOT NULL,
+                failed_at REAL NOT NULL
+            )
+        """)
+        self._chat_ids = {row[0] for row in self.conn.execute("SELECT chat_id FROM unreachable_chats")}
+
+    def is_unreachable(self, chat_id: int) -> bool:
+        return chat_id in self._chat_ids
+
+    def mark(self, chat_id: int, recipient: str, reason: str):
+        """Запомнить, что в чат писать бесполезно"""
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO unreachable_chats (chat_id, recipient, reason, failed_at) VALUES (?, ?, ?, ?)",
+                (chat_id, recipient or "", reason, time.time())
+            )
+            self._chat_ids.add(chat_id)
+        print(f"🚫 Чат @{recipient} ({chat_id}) помечен недоступным: {reason}")
+
+    def clear(self, chat_id: int) -> bool:
+        """Снять отметку (участник снова написал боту). True - если отметка была"""
+        if chat_id not in self._chat_ids:
+            return False
+        with self._lock:
+            self.conn.execute("DELETE FROM unreachable_chats WHERE chat_id = ?", (chat_id,))
+            self._chat_ids.discard(chat_id)
+        print(f"✅ Чат {chat_id} снова доступен")
+        return True
+
+    def split(self, recipients: List[Tuple[str, int]]) -> Tuple[List[Tuple[str, int]], Dict[str, str]]:
+        """Разделить получателей на доступных и пропущенных (с причиной)"""
+        reachable = []
+        skipped = {}
+        for recipient, chat_id in recipients:
+            if chat_id in self._chat_ids:
+                skipped[recipient] = "чат недоступен"
+            else:
+                reachable.append((recipient, chat_id))
+        return reachable, skipped
+
+    def get(self, chat_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM unreachable_chats WHERE chat_id = ?", (chat_id,)).fetchone()
+            return dict(row) if row else None
+
+    def all(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            cursor = self.conn.execute("SELECT * FROM unreachable_chats ORDER BY failed_at DESC")
+            return [dict(row) for row in cursor.fetchall()]
+
+
+# Глобальный экземпляр
+unreachable_chats = UnreachableRegistry(config.LOCAL_DB_PATH)